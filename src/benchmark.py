@@ -0,0 +1,154 @@
+"""Offline benchmark of the checker and modules against `mock_node`.
+
+    python src/benchmark.py --wallets 10 100 1000 --latency 0.05
+
+Everything runs in a temporary copy of data/, so real caches, txn history
+and checker results are left alone. Sleeps are disabled and, unless
+--rate-limits is passed, so are the per-host rate limits.
+"""
+
+import argparse, contextlib, io, os, secrets, shutil, sys, tempfile, time
+import numpy as np
+import tabulate
+
+ENTRIES = ("Checker", "AsyncChecker", "Wrap", "Rubyscore")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--entries", nargs="+", choices=ENTRIES, default=ENTRIES)
+    parser.add_argument("--latency", type=float, default=0.05, help="per request, s")
+    parser.add_argument("--confirm-delay", type=float, default=0, help="seconds")
+    parser.add_argument(
+        "--txns", type=int, default=2, help="txns left per wallet until 73k points"
+    )
+    parser.add_argument(
+        "--rpc-endpoints", type=int, default=1, choices=[1, 2], help="size of RPC pool"
+    )
+    parser.add_argument("--rate-limits", action="store_true", help="keep limits")
+    parser.add_argument("--verbose", action="store_true", help="show app logs")
+    return parser.parse_args()
+
+
+def prepare_workdir() -> str:
+    workdir = tempfile.mkdtemp(prefix="taiko-benchmark-")
+    os.makedirs(os.path.join(workdir, "data"))
+    shutil.copytree("data/abi", os.path.join(workdir, "data/abi"))
+    os.chdir(workdir)
+    return workdir
+
+
+def configure(args: argparse.Namespace, node):
+    """Points the app at the mock node. Must run before `core` is imported,
+    since modules copy settings with `from settings import ...`."""
+    import config, settings
+    from loguru import logger
+
+    # localhost is the same node under another host, for a pool of two
+    settings.RPC = [node.url("rpc"), node.url("rpc").replace("127.0.0.1", "localhost")]
+    settings.RPC = settings.RPC[: args.rpc_endpoints]
+    settings.RPC_WS = ""
+    config.EXPLORER_API_URL = node.url("explorer") + "/api"
+    config.TRAILBLAZER_API_URL = node.url("trailblazer") + "/s2/user/rank"
+    config.PRICE_API_URL = node.url("price") + "/api/v3/ticker/price"
+    settings.SLEEP_BETWEEN_WALLETS = (0, 0)
+    settings.SLEEP_BETWEEN_TXNS = (0, 0)
+    if not args.rate_limits:
+        settings.RPC_RATE_LIMIT = settings.DEFAULT_RATE_LIMIT = 10**6
+        settings.HOST_RATE_LIMITS = {}
+
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "WARNING")
+
+
+def timed_module(module: type, latencies: list[float]) -> type:
+    class Timed(module):
+        def run(self):
+            start = time.perf_counter()
+            try:
+                return super().run()
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    Timed.__name__ = module.__name__  # metrics are labelled by module name
+    return Timed
+
+
+def timed_checker(checker: type, latencies: list[float]) -> type:
+    class Timed(checker):
+        def run(self):
+            self.started_at = time.perf_counter()
+            return super().run()
+
+        def add_result(self, *result):
+            latencies.append(time.perf_counter() - self.started_at)
+            super().add_result(*result)
+
+    return Timed
+
+
+def run_entry(entry: str, wallets: list, node) -> dict:
+    import core
+
+    latencies = []
+    node.reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # checker tables
+        if entry in ("Checker", "AsyncChecker"):
+            timed_checker(getattr(core, entry), latencies)(wallets).run()
+        else:
+            module = timed_module(getattr(core, entry), latencies)
+            core.Scheduler(module, wallets).run()
+    wall = time.perf_counter() - start
+
+    counts = node.counts
+    return {
+        "Entry": entry,
+        "Wallets": len(wallets),
+        "Wall (s)": f"{wall:.2f}",
+        "Wallets/s": f"{len(wallets) / wall:.1f}",
+        "HTTP requests": sum(counts[service] for service in node.SERVICES),
+        "RPC calls": sum(v for k, v in counts.items() if k.startswith("rpc:")),
+        "Txns": counts["rpc:eth_sendRawTransaction"],
+        "p50 (s)": f"{np.percentile(latencies, 50):.3f}" if latencies else "-",
+        "p99 (s)": f"{np.percentile(latencies, 99):.3f}" if latencies else "-",
+        "Requests by service": ", ".join(
+            f"{service} {counts[service]}" for service in node.SERVICES
+        ),
+    }
+
+
+def main():
+    args = parse_args()
+    workdir = prepare_workdir()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from mock_node import MockNode
+
+    node = MockNode(args.latency, args.confirm_delay, 73000 - args.txns * 1000)
+    node.start()
+    configure(args, node)
+    import core
+
+    rows = []
+    try:
+        for size in args.wallets:
+            for entry in args.entries:
+                keys = ["0x" + secrets.token_hex(32) for _ in range(size)]
+                rows.append(run_entry(entry, core.load_wallets(keys), node))
+                print(f"{entry} with {size} wallets: {rows[-1]['Wall (s)']}s")
+    finally:
+        node.stop()
+        os.chdir("/")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(tabulate.tabulate(rows, headers="keys", tablefmt="rounded_grid"))
+    print(
+        "p50/p99 — per wallet: time to its checker row, or its module run time.\n"
+        f"Mock latency {args.latency}s per request, "
+        f"confirmations after {args.confirm_delay}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
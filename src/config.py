@@ -1,13 +1,12 @@
-import json, os, sys, datetime
+import json, os, sys
+from functools import cache
 from loguru import logger
 
-
 logger.remove()
 logs_format = "<white>{time:HH:mm:ss}</white> | <bold><level>{level: <7}</level></bold> | <level>{message}</level>"
 logger.add(sink=sys.stdout, format=logs_format)
-logger.add(
-    sink=f'data/logs/{datetime.datetime.today().strftime("%Y-%m-%d")}.log',
-    format=logs_format,
+logger.add(  # a new file every day, the daemon runs for days
+    sink="data/logs/{time:YYYY-MM-DD}.log", format=logs_format, rotation="00:00"
 )
 
 
@@ -15,27 +14,42 @@ if not os.path.exists("data/checker"):
     os.makedirs("data/checker")
 if not os.path.exists("data/logs"):
     os.makedirs("data/logs")
-if not os.path.exists("data/keys.txt"):
-    open("data/keys.txt", "w").close()
-    logger.critical(
-        f"Fill in the wallet list! 👉 {os.path.join(os.getcwd(), 'data/keys.txt')}"
-    )
-    sys.exit(0)
 
 
-with open("data/keys.txt", "r") as file:
-    KEYS = [x.strip() for x in file.readlines()]
+def load_keys() -> list[str]:
+    if not os.path.exists("data/keys.txt"):
+        open("data/keys.txt", "w").close()
+        logger.critical(
+            f"Fill in the wallet list! 👉 {os.path.join(os.getcwd(), 'data/keys.txt')}"
+        )
+        sys.exit(0)
+    with open("data/keys.txt", "r") as file:
+        return [x.strip() for x in file.readlines()]
 
-with open("data/abi/weth.json", "r") as file:
-    WETH_CONTRACT_ABI = json.load(file)
 
-with open("data/abi/rubyscore.json", "r") as file:
-    RUBYSCORE_CONTRACT_ABI = json.load(file)
+@cache
+def load_abi(name: str) -> list[dict]:
+    with open(f"data/abi/{name}.json", "r") as file:
+        return json.load(file)
 
 
 WETH_CONTRACT_ADDRESS = "0xA51894664A773981C6C112C43ce576f315d5b1B6"
 RUBYSCORE_CONTRACT_ADDRESS = "0x4D1E2145082d0AB0fDa4a973dC4887C7295e21aB"
 
+EXPLORER_API_URL = "https://api.taikoscan.io/api"
+TRAILBLAZER_API_URL = "https://trailblazer.mainnet.taiko.xyz/s2/user/rank"
+PRICE_API_URL = "https://api.binance.com/api/v3/ticker/price"
+EXPLORER_PAGE_SIZE = 1000  # txns per txlist request, explorer max is 10000
+EXPLORER_LAG = 120  # in seconds, explorer may not list txns mined this recently
+
+TXNS_DB_PATH = "data/txns.db"
+ADDRESS_INDEX_PATH = "data/addresses.json"
+HTTP_CACHE_PATH = "data/http_cache.db"
+METRICS_PATH = "data/metrics.prom"
+DAEMON_STATUS_PATH = "data/daemon.json"
+JOURNAL_PATH = "data/journal.jsonl"
+HISTORY_DB_PATH = "data/history.db"
+
 
 GAS_SPENT_COEF = 0.000000004856534
 VOLUME_COEF = 0.0002200895244
@@ -1,5 +1,22 @@
-from .wallet import Wallet
-from .wrap import Wrap
-from .rubyscore import Rubyscore
-from .checker import Checker
-from .utils import sleep
+from importlib import import_module
+
+# Submodules are imported on first attribute access: web3 and aiohttp make up
+# most of the startup time and aren't needed until a module actually runs.
+EXPORTS = {
+    "Wallet": ".wallet",
+    "load_wallets": ".wallet",
+    "select_wallets": ".wallet",
+    "Wrap": ".wrap",
+    "Rubyscore": ".rubyscore",
+    "Checker": ".checker",
+    "AsyncChecker": ".async_checker",
+    "Scheduler": ".scheduler",
+    "sleep": ".utils",
+}
+__all__ = list(EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(EXPORTS[name], __name__), name)
@@ -0,0 +1,194 @@
+import asyncio, aiohttp, json, time, requests
+from functools import partial
+from loguru import logger
+from tqdm import tqdm
+from fake_useragent import UserAgent
+from typing import Callable
+from urllib.parse import urlparse
+
+from config import EXPLORER_API_URL, TRAILBLAZER_API_URL
+from settings import (
+    CHECKER_CONCURRENCY,
+    HTTP_TIMEOUT,
+    RANK_CACHE_TTL,
+    STALE_CACHE_TTL,
+)
+from .checker import Checker
+from .explorer import parse_txlist
+from .http_client import get_http_client, parse_body
+from .ratelimit import RateLimitError, call_with_retries_async, get_host, get_limiter
+from .rpc import make_payload, parse_response, chunks, get_batch_name
+from .metrics import labels, observe, timer
+from .state import WalletState, get_state_calls, parse_states
+from .rpc_pool import get_pool
+from .txns_store import get_txns_store
+from .wallet import Wallet
+
+
+class AsyncChecker(Checker):
+    """Same rows and totals as `Checker`, but all wallets are checked on one
+    event loop with shared keep-alive sessions and per-service limits."""
+
+    async def request_async(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        parse: Callable = json.loads,
+        **kwargs,
+    ):
+        """One HTTP request, observed like the `requests` sessions' hook.
+        Failures are raised as `requests` exceptions, so retries and error
+        handling are the same as for `HttpClient`."""
+        start, body, status = time.perf_counter(), b"", 0
+        try:
+            async with self.limits[service]:
+                async with self.session.request(method, url, **kwargs) as r:
+                    body, status = await r.read(), r.status
+        except asyncio.TimeoutError as e:
+            raise requests.Timeout(f"{url} timed out") from e
+        except aiohttp.ClientError as e:
+            raise requests.ConnectionError(str(e)) from e
+        finally:
+            observe(
+                "http",
+                get_host(url),
+                time.perf_counter() - start,
+                error=not 200 <= status < 400,
+                sent=len(kwargs.get("data", "")),
+                received=len(body),
+            )
+
+        response = requests.Response()
+        response.status_code, response.url = status, url
+        if status == 429 or b"Max rate limit reached" in body:
+            raise RateLimitError(
+                f"Rate limit reached: {body[:100].decode(errors='replace')}",
+                response=response,
+            )
+        response.raise_for_status()
+        return parse_body(parse, body, url)
+
+    async def fetch_async(
+        self, service: str, url: str, params: dict, parse: Callable = json.loads
+    ) -> dict:
+        """`HttpClient.fetch` on the event loop."""
+        host = get_host(url)
+        with timer("api", host + urlparse(url).path):
+            return await call_with_retries_async(
+                host,
+                partial(self.request_async, params=params),
+                service,
+                "GET",
+                url,
+                parse,
+            )
+
+    async def get_txns_async(self, wallet: Wallet):
+        store = get_txns_store()
+        while True:
+            start_block = store.get_last_block(wallet.address)
+            try:
+                data = await self.fetch_async(
+                    "explorer",
+                    EXPLORER_API_URL,
+                    Checker.get_txns_params(wallet, start_block),
+                    parse_txlist,
+                )
+            except requests.RequestException as e:
+                data = e
+            if not Checker.handle_page(wallet, data, start_block):
+                return store.get_txns(wallet.address)
+
+    async def get_stats_async(self, wallet: Wallet, force: bool = False):
+        client = get_http_client()
+        params = {"address": wallet.address}
+        if not force:
+            data = client.get_fresh(
+                TRAILBLAZER_API_URL, params, RANK_CACHE_TTL, STALE_CACHE_TTL
+            )
+            if data is not None:
+                return data
+        try:
+            data = await self.fetch_async("trailblazer", TRAILBLAZER_API_URL, params)
+        except requests.RequestException as e:
+            logger.debug(e)
+            return Checker.get_cached_stats(wallet)
+        client.set_cached(client.get_key(TRAILBLAZER_API_URL, params), data)
+        return data
+
+    async def rpc_batch_async(self, calls: list[tuple[str, list]]) -> list:
+        async def send(chunk: list[tuple[str, list]]) -> list:
+            """Fails over to the next best pool endpoint, no hedging."""
+            with timer("rpc", get_batch_name(chunk)):
+                endpoints = get_pool().ranked()
+                for endpoint in endpoints:
+                    await get_limiter(endpoint.host).acquire_async()
+                    start = time.perf_counter()
+                    try:
+                        data = await self.request_async(
+                            "rpc",
+                            "POST",
+                            endpoint.url,
+                            data=json.dumps(make_payload(chunk)),
+                            headers={"Content-Type": "application/json"},
+                        )
+                    except requests.RequestException:
+                        endpoint.record(time.perf_counter() - start, error=True)
+                        if endpoint is endpoints[-1]:
+                            raise
+                    else:
+                        endpoint.record(time.perf_counter() - start)
+                        return parse_response(data)
+
+        results = await asyncio.gather(*[send(chunk) for chunk in chunks(calls)])
+        return [result for chunk in results for result in chunk]
+
+    async def get_states_async(self, addresses: list[str]) -> dict[str, WalletState]:
+        calls = [call for address in addresses for call in get_state_calls(address)]
+        return parse_states(addresses, await self.rpc_batch_async(calls))
+
+    async def check_wallet_async(self, wallet: Wallet, state: WalletState):
+        if wallet.address in self.unchanged:
+            with labels(wallet.address, "Checker"):
+                stats = await self.get_stats_async(wallet)
+            all_txns = get_txns_store().get_txns(wallet.address)
+            return self.build_row(wallet, stats, all_txns, state)
+
+        with labels(wallet.address, "Checker"):
+            stats, all_txns = await asyncio.gather(
+                self.get_stats_async(wallet, force=wallet.address in self.changed),
+                self.get_txns_async(wallet),
+            )
+        return self.build_row(wallet, stats, all_txns, state)
+
+    async def check_wallets_async(self):
+        self.limits = {
+            service: asyncio.Semaphore(limit)
+            for service, limit in CHECKER_CONCURRENCY.items()
+        }
+        connector = aiohttp.TCPConnector(limit=sum(CHECKER_CONCURRENCY.values()))
+        async with aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": UserAgent().random},
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+        ) as self.session:
+            states = await self.get_states_async(
+                [wallet.address for wallet in self.wallets]
+            )
+            self.save_states(states)
+
+            tasks = [
+                self.check_wallet_async(wallet, states[wallet.address])
+                for wallet in self.wallets
+            ]
+            for task in tqdm(
+                asyncio.as_completed(tasks),
+                total=len(tasks),
+                desc="Checking wallets",
+                leave=False,
+            ):
+                self.add_result(*await task)
+
+    def check_wallets(self):
+        asyncio.run(self.check_wallets_async())
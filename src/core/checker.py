@@ -1,103 +1,182 @@
-import requests, tabulate, datetime, csv, os
+import requests, tabulate, datetime, csv, os, json, time
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from loguru import logger
 from tqdm import tqdm
-from fake_useragent import UserAgent
 from dotenv import load_dotenv
 
-from config import GAS_SPENT_COEF, VOLUME_COEF, LEVEL_DICT
+from config import (
+    GAS_SPENT_COEF,
+    VOLUME_COEF,
+    LEVEL_DICT,
+    EXPLORER_API_URL,
+    TRAILBLAZER_API_URL,
+    EXPLORER_PAGE_SIZE,
+)
+from settings import (
+    CHECKER_JSONL,
+    CHECKER_HISTORY,
+    CHECKER_INCREMENTAL,
+    CHECKER_PAGE_SIZE,
+    RANK_CACHE_TTL,
+    STALE_CACHE_TTL,
+)
 from .wallet import Wallet
-from .utils import get_eth_price
+from .state import WalletState, get_states
+from .txns_store import get_txns_store
+from .points import TxnFrame
+from .explorer import Txn, parse_txlist
+from .history import Snapshot, get_history_store
+from .utils import get_eth_price, stop_event
+from .http_client import get_http_client
+from . import metrics
 
 load_dotenv()
 
+NO_STATS = {"score": 0, "rank": 0, "blacklisted": False}  # rank request failed
+
 
 class Checker:
     def __init__(self, wallets: list[Wallet]):
         self.wallets = wallets
         self.eth_price = get_eth_price()
-        self.total_eth = 0
-        self.total_weth = 0
-        self.total_today_txns = 0
-        self.total_all_txns = 0
-        self.total_today_gas = 0
-        self.total_all_gas = 0
+        self.totals = Counter()
+        self.unchanged: set[str] = set()
+        self.changed: set[str] = set()
+
+    @staticmethod
+    def get_txns_params(wallet: Wallet, start_block: int = 0) -> dict:
+        params = {
+            "module": "account",
+            "action": "txlist",
+            "address": wallet.address,
+            "startblock": start_block,
+            "endblock": 9999999999,
+            "page": 1,
+            "offset": EXPLORER_PAGE_SIZE,
+            "sort": "asc",
+        }
+        if api_key := os.getenv("EXPLORER_API_KEY"):
+            params["apikey"] = api_key
+        return params
 
     @staticmethod
-    def get_txns(wallet: Wallet):
-        r = requests.get(
-            f"https://api.taikoscan.io/api",
-            params={
-                "module": "account",
-                "action": "txlist",
-                "address": wallet.address,
-                "startblock": 0,
-                "endblock": 9999999999,
-                "page": 1,
-                "sort": "asc",
-                "apikey": os.getenv("EXPLORER_API_KEY"),
-            },
-            headers={"User-Agent": UserAgent().random},
+    def save_txns(wallet: Wallet, txns: list[Txn], start_block: int) -> bool:
+        """Stores a page of explorer history, returns True if there is more.
+
+        Pages start at the last synced block (inclusive, duplicates are
+        ignored by hash) which also sidesteps the explorer's 10k result window.
+        """
+        last_block = max([txn.block_number for txn in txns] or [start_block])
+        get_txns_store().add_txns(
+            wallet.address, Checker.filter_txns(wallet, txns), last_block
         )
-        data = r.json()
-        if r.status_code != 200 or data["status"] != "1":
-            logger.error(f"{wallet.info} Request for stats failed!")
-            return logger.debug(r.text)
+        return len(txns) >= EXPLORER_PAGE_SIZE and last_block > start_block
+
+    @staticmethod
+    def handle_page(
+        wallet: Wallet, data: dict | requests.RequestException, start_block: int
+    ) -> bool:
+        """Stores a fetched txlist page, or logs why there is none. Returns
+        True if the next page should be fetched."""
+        if isinstance(data, Exception) or data["status"] != "1":
+            if (
+                isinstance(data, dict)
+                and data.get("message") == "No transactions found"
+            ):
+                get_txns_store().mark_synced(wallet.address)
+                return False
+            logger.error(
+                f"{wallet.info} Request for txns failed, using cached history!"
+            )
+            logger.debug(data)
+            return False
+        if Checker.save_txns(wallet, data["result"], start_block):
+            return True
+        get_txns_store().mark_synced(wallet.address)
+        return False
+
+    @staticmethod
+    def get_txns(wallet: Wallet, nonce: int | None = None):
+        """With the wallet's current nonce, the explorer is skipped if the
+        stored history already has every txn up to it."""
+        store = get_txns_store()
+        if nonce is not None and nonce == store.get_synced_nonce(wallet.address):
+            return store.get_txns(wallet.address)
+        while True:
+            start_block = store.get_last_block(wallet.address)
+            try:
+                data = get_http_client().fetch(
+                    EXPLORER_API_URL,
+                    Checker.get_txns_params(wallet, start_block),
+                    parse_txlist,
+                )
+            except requests.RequestException as e:
+                data = e
+            if not Checker.handle_page(wallet, data, start_block):
+                return store.get_txns(wallet.address)
 
-        txns = data["result"]
+    @staticmethod
+    def filter_txns(wallet: Wallet, txns: list[Txn]) -> list[Txn]:
+        address = wallet.address.lower()
         return [
-            {**txn, "burnedFees": int(txn["gasUsed"]) * int(txn["gasPrice"])}
+            txn
             for txn in txns
-            if txn["from"] == wallet.address.lower()
-            and txn["to"] != wallet.address.lower()
-            and not txn["functionName"].startswith("transfer")
-            and not txn["functionName"].startswith("approve")
-            and txn["isError"] == "0"
+            if txn.from_address == address
+            and txn.to_address != address
+            and not txn.function_name.startswith(("transfer", "approve"))
+            and not txn.is_error
         ]
 
     @staticmethod
-    def filter_today_txns(txns: list[dict]) -> list[dict]:
+    def filter_today_txns(txns: TxnFrame) -> TxnFrame:
         timestamp = datetime.datetime.combine(
             datetime.datetime.now(datetime.timezone.utc).date(),
             datetime.time.min,
             tzinfo=datetime.timezone.utc,
         ).timestamp()
-        return [txn for txn in txns if int(txn["timeStamp"]) > timestamp]
+        return txns.since(timestamp)
 
     @staticmethod
-    def get_gas_spent_pts(txns: list[dict]) -> float:
-        return sum(
-            [
-                Checker.get_txn_gas_spent_pts(int(txn["burnedFees"]) / 10**18)
-                for txn in txns
-            ]
-        )
+    def get_gas_spent_pts(txns: TxnFrame) -> float:
+        return txns.gas_spent_pts()
 
     @staticmethod
     def get_txn_gas_spent_pts(txn_gas_eth: float) -> float:
         return min(txn_gas_eth / GAS_SPENT_COEF, 1000)
 
     @staticmethod
-    def get_volume_pts(txns: list[dict]) -> float:
-        return sum(
-            [Checker.get_txn_volume_pts(int(txn["value"]) / 10**18) for txn in txns]
-        )
+    def get_volume_pts(txns: TxnFrame) -> float:
+        return txns.volume_pts()
 
     @staticmethod
     def get_txn_volume_pts(txn_value_eth: float) -> float:
         return min(txn_value_eth / VOLUME_COEF, 1000)
 
-    def get_stats(self, wallet: Wallet):
-        r = requests.get(
-            url="https://trailblazer.mainnet.taiko.xyz/s2/user/rank",
-            params={"address": wallet.address},
-            headers={"User-Agent": UserAgent().random},
-        )
-        if r.status_code != 200:
-            logger.error(f"{wallet.info} Request for stats failed!")
-            return logger.debug(r.text)
+    def get_stats(self, wallet: Wallet, force: bool = False):
+        try:
+            return get_http_client().get(
+                TRAILBLAZER_API_URL,
+                params={"address": wallet.address},
+                ttl=RANK_CACHE_TTL,
+                stale=STALE_CACHE_TTL,
+                force=force,
+            )
+        except requests.RequestException as e:
+            logger.debug(e)
+            return Checker.get_cached_stats(wallet)
 
-        return r.json()
+    @staticmethod
+    def get_cached_stats(wallet: Wallet) -> dict | None:
+        """Last known stats of any age, for when the API stays down."""
+        client = get_http_client()
+        cached = client.get_cached(
+            client.get_key(TRAILBLAZER_API_URL, {"address": wallet.address})
+        )
+        if cached is None:
+            return logger.error(f"{wallet.info} Request for stats failed!")
+        logger.warning(f"{wallet.info} Request for stats failed, using cached rank!")
+        return cached[1]
 
     def get_level(self, rank: int):
         if rank == 0:
@@ -108,31 +187,68 @@ class Checker:
 
         return 0
 
-    def get_gas_spent(self, txns: list[dict]) -> float:
-        gas_spent_eth = sum([int(txn["burnedFees"]) / 10**18 for txn in txns])
-        return gas_spent_eth * self.eth_price
+    def get_gas_spent(self, txns: TxnFrame) -> float:
+        return txns.gas_spent_eth() * self.eth_price
+
+    def save_states(self, states: dict[str, WalletState]):
+        """Incremental mode: wallets whose nonce and balances are the same as
+        at their last synced check reuse the stored history and cached rank.
+        Only wallets whose state differs from the stored one get a fresh
+        rank, the others may just be waiting for the explorer to catch up."""
+        if not CHECKER_INCREMENTAL:
+            return
+        store = get_txns_store()
+        self.changed = store.save_states(states)
+        self.unchanged = store.get_synced() & states.keys()
+        logger.info(
+            f"{len(self.unchanged)}/{len(states)} wallets unchanged since the last check"
+        )
+
+    def check_wallet(self, wallet: Wallet, state: WalletState):
+        with metrics.labels(wallet.address, "Checker"):
+            return self.build_row(
+                wallet,
+                stats=self.get_stats(wallet, force=wallet.address in self.changed),
+                all_txns=(
+                    get_txns_store().get_txns(wallet.address)
+                    if wallet.address in self.unchanged
+                    else Checker.get_txns(wallet)
+                ),
+                state=state,
+            )
 
-    def check_wallet(self, wallet: Wallet):
-        stats = self.get_stats(wallet)
-        all_txns = Checker.get_txns(wallet)
+    def build_row(
+        self,
+        wallet: Wallet,
+        stats: dict | None,
+        all_txns: TxnFrame,
+        state: WalletState,
+    ) -> tuple[dict, dict, Snapshot | None]:
+        """Without stats the rank columns are left blank and no snapshot is
+        kept, one failed request doesn't fail the whole check."""
+        known = stats is not None
+        stats = stats or NO_STATS
         today_txns = Checker.filter_today_txns(all_txns)
         all_gas = self.get_gas_spent(all_txns)
         today_gas = self.get_gas_spent(today_txns)
         volume_pts = Checker.get_volume_pts(today_txns)
         gas_spent_pts = Checker.get_gas_spent_pts(today_txns)
 
-        self.total_eth += wallet.eth_balance / 10**18 or 0
-        self.total_weth += wallet.weth_balance or 0
-        self.total_all_txns += len(all_txns or [])
-        self.total_today_txns += len(today_txns or [])
-        self.total_all_gas += all_gas or 0
-        self.total_today_gas += today_gas or 0
-
-        return {
+        totals = {
+            "eth": state.eth_balance / 10**18 or 0,
+            "weth": state.weth_balance / 10**18 or 0,
+            "all_txns": len(all_txns or []),
+            "today_txns": len(today_txns or []),
+            "all_gas": all_gas or 0,
+            "today_gas": today_gas or 0,
+            "banned": int(bool(stats["blacklisted"])),
+            "wallets": 1,
+        }
+        row = {
             "№": wallet.index,
             "Address": f"{wallet.address[:5]}...{wallet.address[-5:]}",
-            "ETH": f"{wallet.eth_balance/10**18:.5f}",
-            "WETH": f"{wallet.weth_balance:.5f}",
+            "ETH": f"{state.eth_balance/10**18:.5f}",
+            "WETH": f"{state.weth_balance/10**18:.5f}",
             "Txns\n24h|all": f"{len(today_txns):,.0f}|{len(all_txns):,.0f}",
             "Score": f"{stats['score']:,.0f}",
             "Rank": f"#{stats['rank']:,.0f}",
@@ -142,57 +258,128 @@ class Checker:
             "Gas\n(%)": f"{gas_spent_pts/73000*100:.1f}%",
             "Gas ($)\n24h|all": f"{today_gas:,.2f}|{all_gas:,.2f}",
         }
+        snapshot = Snapshot(
+            address=wallet.address,
+            checked_at=time.time(),
+            eth=state.eth_balance / 10**18,
+            weth=state.weth_balance / 10**18,
+            txns_today=len(today_txns),
+            txns_all=len(all_txns),
+            score=stats["score"],
+            rank=stats["rank"],
+            level=self.get_level(stats["rank"]),
+            banned=bool(stats["blacklisted"]),
+            gas_pts=gas_spent_pts,
+            volume_pts=volume_pts,
+            gas_today_usd=today_gas,
+            gas_all_usd=all_gas,
+        )
+        if not known:
+            row.update(dict.fromkeys(("Score", "Rank", "LVL", "Ban"), "-"))
+            snapshot = None
+        return row, totals, snapshot
 
-    def get_total(self, results: list[dict]):
+    def get_total(self):
+        totals = self.totals
         return {
             "№": "Total",
-            "ETH": f"{self.total_eth:.5f}",
-            "WETH": f"{self.total_weth:.5f}",
-            "Txns\n24h|all": f"{self.total_today_txns:,.0f}|{self.total_all_txns:,.0f}",
-            "Ban": f"{sum(wallet["Ban"] == "✅" for wallet in results)}/{len(results)}",
-            "Gas ($)\n24h|all": f"{self.total_today_gas:.2f}|{self.total_all_gas:.2f}",
+            "ETH": f"{totals['eth']:.5f}",
+            "WETH": f"{totals['weth']:.5f}",
+            "Txns\n24h|all": f"{totals['today_txns']:,.0f}|{totals['all_txns']:,.0f}",
+            "Ban": f"{totals['banned']}/{totals['wallets']}",
+            "Gas ($)\n24h|all": f"{totals['today_gas']:.2f}|{totals['all_gas']:.2f}",
         }
 
-    def run(self):
-        results = []
-        with ThreadPoolExecutor() as executor:
-            futures = {
-                executor.submit(self.check_wallet, wallet): wallet
-                for wallet in self.wallets
-            }
+    def open_outputs(self):
+        time_now = datetime.datetime.now().strftime("%Y-%m-%d")
+        self.csv_file = open(f"data/checker/{time_now}.csv", mode="w", newline="")
+        self.csv_writer = None
+        self.jsonl_file = None
+        if CHECKER_JSONL:
+            self.jsonl_file = open(f"data/checker/{time_now}.jsonl", mode="w")
+
+    def write_row(self, row: dict):
+        if self.csv_file is None:  # only now, a failed run keeps today's file
+            self.open_outputs()
+        row = {key.replace("\n", " "): value for key, value in row.items()}
+        if self.csv_writer is None:
+            self.csv_writer = csv.DictWriter(self.csv_file, fieldnames=row.keys())
+            self.csv_writer.writeheader()
+        self.csv_writer.writerow(row)
+        self.csv_file.flush()
+        if self.jsonl_file:
+            self.jsonl_file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self.jsonl_file.flush()
+
+    def close_outputs(self):
+        self.csv_file.close()
+        if self.jsonl_file:
+            self.jsonl_file.close()
+
+    def print_page(self, rows: list[dict]):
+        if rows:
+            tqdm.write(tabulate.tabulate(rows, headers="keys", tablefmt="rounded_grid"))
+
+    def add_result(self, row: dict, totals: dict, snapshot: Snapshot | None):
+        """Called once per checked wallet, always from the thread that runs
+        `check_wallets`, so totals are reduced without locking."""
+        self.totals.update(totals)
+        if snapshot is not None:
+            self.snapshots.append(snapshot)
+        self.write_row(row)
+
+        # rows are printed in wallet order, a page at a time
+        self.unprinted[self.positions[row["№"]]] = row
+        while self.next_position in self.unprinted:
+            self.page.append(self.unprinted.pop(self.next_position))
+            self.next_position += 1
+        if len(self.page) >= CHECKER_PAGE_SIZE:
+            self.print_page(self.page)
+            self.page = []
+
+    def check_wallets(self):
+        states = get_states([wallet.address for wallet in self.wallets])
+        self.save_states(states)
+        executor = ThreadPoolExecutor()
+        futures = {
+            executor.submit(self.check_wallet, wallet, states[wallet.address]): wallet
+            for wallet in self.wallets
+        }
+        try:
             for future in tqdm(
                 as_completed(futures),
                 total=len(futures),
                 desc="Checking wallets",
                 leave=False,
             ):
-                results.append(future.result())
-        results.append(self.get_total(results))
-        results = sorted(
-            results,
-            key=lambda x: (
-                x["№"] == "total",
-                x["№"] if isinstance(x["№"], int) else float("inf"),
-            ),
-        )
-
-        print(
-            tabulate.tabulate(
-                results,
-                headers="keys",
-                tablefmt="rounded_grid",
-            )
-        )
+                self.add_result(*future.result())
+        except KeyboardInterrupt:
+            # totals are written right away, not after the remaining wallets
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
 
-        time_now = datetime.datetime.now().strftime("%Y-%m-%d")
-        results = [
-            {key.replace("\n", " "): value for key, value in result.items()}
-            for result in results
-        ]
-        with open(f"data/checker/{time_now}.csv", mode="w", newline="") as file:
-            writer = csv.DictWriter(
-                file,
-                fieldnames=results[0].keys(),
+    def run(self):
+        self.totals = Counter()
+        self.positions = {wallet.index: i for i, wallet in enumerate(self.wallets)}
+        self.unprinted, self.page, self.next_position = {}, [], 0
+        self.snapshots: list[Snapshot] = []
+        self.csv_file = None
+        try:
+            with metrics.labels(module="Checker"):
+                self.check_wallets()
+        finally:
+            # a partial run still leaves every finished row plus totals
+            total = self.get_total()
+            self.print_page(
+                self.page
+                + [self.unprinted[i] for i in sorted(self.unprinted)]
+                + [total]
             )
-            writer.writeheader()
-            writer.writerows(results)
+            if self.csv_file is not None:
+                self.write_row(total)
+                self.close_outputs()
+            if CHECKER_HISTORY:
+                get_history_store().add_snapshots(self.snapshots)
+            metrics.report()
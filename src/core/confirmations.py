@@ -0,0 +1,125 @@
+import json, threading, time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import cache
+from loguru import logger
+from websockets.sync.client import connect
+
+from settings import RPC_WS
+from .rpc import rpc_batch
+from .metrics import labels
+from .utils import stop_event
+
+POLL_INTERVAL: tuple[float, float] = (0.5, 5)  # min and max seconds between polls
+
+
+class Confirmer:
+    """One background watcher for the pending hashes of every wallet. All of
+    them are checked with a single batched receipt query, either once per
+    new block (websocket `newHeads` subscription) or on an adaptive poll."""
+
+    def __init__(self):
+        self.pending: dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.has_pending = threading.Event()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def wait(self, groups: list[list[str]], timeout: float) -> dict[str, dict]:
+        """Waits until one hash of every group, e.g. a txn and its
+        replacements, is mined. Returns receipts of the hashes mined within
+        the timeout."""
+        with self.lock:
+            futures = {
+                hash: self.pending.setdefault(hash, Future())
+                for group in groups
+                for hash in group
+            }
+            self.has_pending.set()
+        deadline = time.monotonic() + timeout
+        left = [[futures[hash] for hash in group] for group in groups]
+        try:
+            while left := [g for g in left if not any(f.done() for f in g)]:
+                if (remaining := deadline - time.monotonic()) <= 0:
+                    break
+                # short slices, so Ctrl+C doesn't wait for pending txns
+                wait(
+                    sum(left, []),
+                    timeout=min(remaining, 1),
+                    return_when=FIRST_COMPLETED,
+                )
+                if stop_event.is_set():
+                    raise KeyboardInterrupt
+        finally:
+            with self.lock:
+                for hash, future in futures.items():
+                    if not future.done():
+                        self.pending.pop(hash, None)
+        return {hash: f.result() for hash, f in futures.items() if f.done()}
+
+    def check(self) -> bool:
+        with self.lock:
+            hashes = list(self.pending)
+        if not hashes:
+            return False
+        try:
+            receipts = rpc_batch(
+                [("eth_getTransactionReceipt", [hash]) for hash in hashes]
+            )
+        except Exception as e:
+            logger.debug(f"Receipts request failed: {e}")
+            return False
+
+        confirmed = False
+        with self.lock:
+            for hash, receipt in zip(hashes, receipts):
+                if receipt is not None and hash in self.pending:
+                    self.pending.pop(hash).set_result(receipt)
+                    confirmed = True
+            if not self.pending:
+                self.has_pending.clear()
+        return confirmed
+
+    def run_ws(self):
+        with connect(RPC_WS) as ws:
+            ws.send(
+                json.dumps(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": 1,
+                        "method": "eth_subscribe",
+                        "params": ["newHeads"],
+                    }
+                )
+            )
+            json.loads(ws.recv())["result"]  # raises if subscription rejected
+            for _ in ws:  # one message per new block
+                self.check()
+
+    def run_polling(self):
+        interval = POLL_INTERVAL[0]
+        while True:
+            if not self.has_pending.is_set():
+                interval = POLL_INTERVAL[0]
+                self.has_pending.wait()
+            time.sleep(interval)
+            if self.check():
+                interval = POLL_INTERVAL[0]
+            else:
+                interval = min(interval * 1.5, POLL_INTERVAL[1])
+
+    def run(self):
+        with labels(module="Confirmer"):
+            self.watch()
+
+    def watch(self):
+        if RPC_WS:
+            try:
+                self.run_ws()
+            except Exception as e:
+                logger.warning("Block subscription failed, polling receipts instead")
+                logger.debug(e)
+        self.run_polling()
+
+
+@cache
+def get_confirmer() -> Confirmer:
+    return Confirmer()
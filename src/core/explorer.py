@@ -0,0 +1,43 @@
+import json, sys
+
+
+class Txn:
+    """A txlist entry cut down to what the history and points need, with
+    numbers already converted. Explorer entries have 20+ string fields."""
+
+    __slots__ = (
+        "hash",
+        "block_number",
+        "time_stamp",
+        "value",
+        "gas_used",
+        "gas_price",
+        "from_address",
+        "to_address",
+        "function_name",
+        "is_error",
+    )
+
+    def __init__(self, entry: dict):
+        self.hash: str = entry["hash"]
+        self.block_number = int(entry["blockNumber"])
+        self.time_stamp = int(entry["timeStamp"])
+        self.value = int(entry["value"])
+        self.gas_used = int(entry["gasUsed"])
+        self.gas_price = int(entry["gasPrice"])
+        # repeat in almost every entry, one shared copy each
+        self.from_address: str = sys.intern(entry["from"])
+        self.to_address: str = sys.intern(entry["to"])
+        self.function_name: str = sys.intern(entry["functionName"])
+        self.is_error = entry["isError"] != "0"
+
+
+def to_txn(entry: dict) -> Txn | dict:
+    """`json` object hook, every entry is replaced as soon as it is parsed,
+    so full dicts for the whole page never exist at the same time."""
+    return Txn(entry) if "timeStamp" in entry else entry
+
+
+def parse_txlist(text: str | bytes) -> dict:
+    """Explorer txlist response with `Txn`s in its "result"."""
+    return json.loads(text, object_hook=to_txn)
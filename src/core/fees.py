@@ -0,0 +1,90 @@
+import random, threading, time
+from functools import cache
+from loguru import logger
+
+from settings import EIP1559, FEE_PERCENTILE, GAS_MULTIPLIER
+from .rpc import get_w3
+
+FEE_TTL = 5  # in seconds, how long sampled fees are shared by all txns
+FEE_BLOCKS = 10  # recent blocks the priority fee is taken from
+BASE_FEE_MARGIN = 2  # max fee covers the base fee doubling before inclusion
+
+
+class FeeOracle:
+    """Prices txns of every wallet from one `eth_feeHistory` sample per
+    FEE_TTL. Type-2 txns pay the next base fee plus the FEE_PERCENTILE
+    priority fee of recent blocks, with room for the base fee to rise.
+    Falls back to a cached legacy `eth_gasPrice` if the node has no fee
+    history or EIP1559 is off."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fetched_at = 0.0
+        self.base_fee: int | None = None  # of the next block, None — legacy
+        self.priority_fee = 0
+        self.gas_price = 0
+
+    def refresh(self):
+        with self.lock:
+            if time.monotonic() - self.fetched_at < FEE_TTL:
+                return
+            w3 = get_w3()
+            self.base_fee = None
+            if EIP1559:
+                try:
+                    history = w3.eth.fee_history(FEE_BLOCKS, "latest", [FEE_PERCENTILE])
+                    rewards = sorted(reward[0] for reward in history["reward"])
+                    self.base_fee = history["baseFeePerGas"][-1]
+                    self.priority_fee = rewards[len(rewards) // 2] if rewards else 0
+                except Exception as e:
+                    logger.debug(f"No fee history, using legacy gas price: {e}")
+            if self.base_fee is None:
+                self.gas_price = w3.eth.gas_price
+            self.fetched_at = time.monotonic()
+
+    def get_min_price(self) -> int:
+        """Lowest price per gas that still gets a txn into the next blocks."""
+        self.refresh()
+        if self.base_fee is None:
+            return self.gas_price
+        return self.base_fee + self.priority_fee
+
+    def get_fees(self) -> dict:
+        """Fee fields of a new txn, randomized by GAS_MULTIPLIER."""
+        self.refresh()
+        multiplier = random.uniform(*GAS_MULTIPLIER)
+        if self.base_fee is None:
+            return {"gasPrice": int(self.gas_price * multiplier)}
+        priority_fee = int(self.priority_fee * multiplier)
+        return {
+            "maxFeePerGas": self.base_fee * BASE_FEE_MARGIN + priority_fee,
+            "maxPriorityFeePerGas": priority_fee,
+        }
+
+
+@cache
+def get_fee_oracle() -> FeeOracle:
+    return FeeOracle()
+
+
+def get_max_price(txn: dict) -> int:
+    """Highest price per gas the txn may pay, whatever its type."""
+    return txn.get("maxFeePerGas") or txn["gasPrice"]
+
+
+def set_price(txn: dict, price: int):
+    """Fixes the price per gas: a type-2 txn with equal max and priority
+    fees pays exactly `price` while the base fee is below it."""
+    if "maxFeePerGas" in txn:
+        txn["maxFeePerGas"] = txn["maxPriorityFeePerGas"] = price
+    else:
+        txn["gasPrice"] = price
+
+
+def bump(txn: dict, factor: float = 1.15):
+    """Raises all fee fields for a replacement (nodes want +10%), at least
+    up to the current fees."""
+    fees = get_fee_oracle().get_fees()
+    for key in ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas"):
+        if key in txn:
+            txn[key] = max(int(txn[key] * factor), fees.get(key, 0))
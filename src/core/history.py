@@ -0,0 +1,156 @@
+import datetime, sqlite3, threading
+from dataclasses import astuple, dataclass, fields
+from functools import cache
+
+from config import HISTORY_DB_PATH
+
+
+@dataclass
+class Snapshot:
+    """One checker result, as numbers. Points are the day's so far."""
+
+    address: str  # stored lowercase
+    checked_at: float  # unix time
+    eth: float
+    weth: float
+    txns_today: int
+    txns_all: int
+    score: float
+    rank: int
+    level: int
+    banned: bool
+    gas_pts: float
+    volume_pts: float
+    gas_today_usd: float
+    gas_all_usd: float
+
+
+COLUMNS = [field.name for field in fields(Snapshot)]
+SCHEMA = (
+    "address TEXT NOT NULL, checked_at REAL NOT NULL, "
+    "eth REAL NOT NULL, weth REAL NOT NULL, "
+    "txns_today INTEGER NOT NULL, txns_all INTEGER NOT NULL, "
+    "score REAL NOT NULL, rank INTEGER NOT NULL, "
+    "level INTEGER NOT NULL, banned INTEGER NOT NULL, "
+    "gas_pts REAL NOT NULL, volume_pts REAL NOT NULL, "
+    "gas_today_usd REAL NOT NULL, gas_all_usd REAL NOT NULL, day TEXT NOT NULL"
+)
+
+
+def get_day(timestamp: float) -> str:
+    """UTC day, when daily points reset."""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime(
+        "%Y-%m-%d"
+    )
+
+
+class HistoryStore:
+    """Every checker result per wallet, so trends over months of checks are
+    one indexed query instead of re-reading CSVs or APIs.
+
+    `snapshots` keeps every check, `daily` only the last check of every
+    wallet per UTC day, which is what the reports are built from.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS snapshots ({SCHEMA}, "
+                "PRIMARY KEY (address, checked_at))"
+            )
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS daily ({SCHEMA}, "
+                "PRIMARY KEY (day, address)) WITHOUT ROWID"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS daily_address ON daily (address, day)"
+            )
+
+    def add_snapshots(self, snapshots: list[Snapshot]):
+        columns = ", ".join(COLUMNS + ["day"])
+        placeholders = ", ".join("?" * (len(COLUMNS) + 1))
+        rows = [
+            (snapshot.address.lower(),)
+            + astuple(snapshot)[1:]
+            + (get_day(snapshot.checked_at),)
+            for snapshot in snapshots
+        ]
+        with self.lock, self.conn:
+            for table in ("snapshots", "daily"):  # checks only move forward
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({columns}) "
+                    f"VALUES ({placeholders})",
+                    rows,
+                )
+
+    def query(
+        self,
+        sql: str,
+        start: datetime.date,
+        end: datetime.date,
+        addresses: list[str] | None = None,
+    ) -> list[dict]:
+        """Runs `sql` with its {where} limiting `daily` to the range of days
+        and the addresses."""
+        params = {"start": start.isoformat(), "end": end.isoformat()}
+        where = "day BETWEEN :start AND :end"
+        if addresses is not None:
+            params |= {f"a{i}": a.lower() for i, a in enumerate(addresses)}
+            names = [f":a{i}" for i in range(len(addresses))]
+            where += f" AND address IN ({', '.join(names)})"
+        with self.lock:
+            return [
+                dict(row) for row in self.conn.execute(sql.format(where=where), params)
+            ]
+
+    def get_fleet_totals(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        addresses: list[str] | None = None,
+    ) -> list[dict]:
+        """Per day: sums over every wallet's last check of the day. Rank 0
+        is unranked, the best rank is None if no wallet has one."""
+        return self.query(
+            "SELECT day, COUNT(*) AS wallets, SUM(eth) AS eth, SUM(weth) AS weth, "
+            "SUM(score) AS score, MIN(NULLIF(rank, 0)) AS best_rank, "
+            "SUM(gas_pts) AS gas_pts, SUM(volume_pts) AS volume_pts, "
+            "SUM(txns_today) AS txns, SUM(gas_today_usd) AS gas_usd, "
+            "SUM(banned) AS banned FROM daily WHERE {where} "
+            "GROUP BY day ORDER BY day",
+            start,
+            end,
+            addresses,
+        )
+
+    def get_wallet_trends(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        addresses: list[str] | None = None,
+    ) -> list[dict]:
+        """Per wallet: first and last day of the range, and sums in between."""
+        return self.query(
+            "WITH totals AS (SELECT address, MIN(day) AS first_day, "
+            "MAX(day) AS last_day, COUNT(*) AS days, SUM(gas_pts) AS gas_pts, "
+            "SUM(volume_pts) AS volume_pts, SUM(txns_today) AS txns, "
+            "SUM(gas_today_usd) AS gas_usd FROM daily WHERE {where} "
+            "GROUP BY address) "
+            "SELECT t.*, f.score AS first_score, l.score AS last_score, "
+            "f.rank AS first_rank, l.rank AS last_rank, l.level, l.banned, "
+            "l.eth, l.weth FROM totals t "
+            "JOIN daily f ON f.day = t.first_day AND f.address = t.address "
+            "JOIN daily l ON l.day = t.last_day AND l.address = t.address "
+            "ORDER BY l.score DESC",
+            start,
+            end,
+            addresses,
+        )
+
+
+@cache
+def get_history_store() -> HistoryStore:
+    return HistoryStore()
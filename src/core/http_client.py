@@ -0,0 +1,133 @@
+import json, sqlite3, threading, time, requests
+from functools import cache
+from typing import Callable
+from urllib.parse import urlencode, urlparse
+from fake_useragent import UserAgent
+from loguru import logger
+
+from config import HTTP_CACHE_PATH
+from settings import HTTP_TIMEOUT
+from .ratelimit import RateLimitError, call_with_retries, get_host
+from .metrics import observe_response, timer
+
+
+class InvalidResponseError(requests.RequestException):
+    """A 200 response whose body isn't the expected JSON, e.g. a maintenance
+    or Cloudflare page."""
+
+
+def parse_body(parse: Callable, body: bytes, url: str):
+    try:
+        return parse(body)
+    except (ValueError, KeyError) as e:
+        raise InvalidResponseError(f"Unexpected body from {url}: {body[:100]!r}") from e
+
+
+class HttpClient:
+    """Keep-alive session for the explorer, Trailblazer and price APIs.
+
+    Responses requested with a `ttl` are cached in SQLite, so they survive
+    restarts. Within `stale` seconds after expiry a cached value is still
+    returned right away while a background thread refreshes it.
+    """
+
+    def __init__(self, cache_path: str = HTTP_CACHE_PATH):
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = UserAgent().random
+        self.session.hooks["response"].append(observe_response)
+        self.lock = threading.Lock()
+        self.refreshing: set[str] = set()
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def get_key(url: str, params: dict | None = None) -> str:
+        params = {k: v for k, v in (params or {}).items() if k != "apikey"}
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def get_cached(self, key: str) -> tuple[float, dict] | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fetched_at, data FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set_cached(self, key: str, data: dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (key, time.time(), json.dumps(data)),
+            )
+
+    def send(
+        self, url: str, params: dict | None = None, parse: Callable = json.loads
+    ) -> dict:
+        r = self.session.get(url, params=params, timeout=HTTP_TIMEOUT)
+        # on bytes, a decoded copy of a whole txlist page is as big as the page
+        if r.status_code == 429 or b"Max rate limit reached" in r.content:
+            raise RateLimitError(f"Rate limit reached: {r.text[:100]}", response=r)
+        r.raise_for_status()
+        return parse_body(parse, r.content, url)
+
+    def fetch(
+        self, url: str, params: dict | None = None, parse: Callable = json.loads
+    ) -> dict:
+        """Uncached GET, `parse` turns the body into the returned value."""
+        with timer("api", get_host(url) + urlparse(url).path):
+            return call_with_retries(get_host(url), self.send, url, params, parse)
+
+    def refresh(self, key: str, url: str, params: dict | None):
+        try:
+            self.set_cached(key, self.fetch(url, params))
+        except requests.RequestException as e:
+            logger.debug(f"Background refresh of {url} failed: {e}")
+        finally:
+            self.refreshing.discard(key)
+
+    def get_fresh(
+        self, url: str, params: dict | None, ttl: float, stale: float = 0
+    ) -> dict | None:
+        """Cached body younger than `ttl`. Within `stale` seconds after that
+        it is still returned, while a background thread refreshes it."""
+        key = self.get_key(url, params)
+        cached = self.get_cached(key)
+        if not cached:
+            return None
+        age = time.time() - cached[0]
+        if age < ttl:
+            return cached[1]
+        if age < ttl + stale:
+            if key not in self.refreshing:
+                self.refreshing.add(key)
+                threading.Thread(
+                    target=self.refresh, args=(key, url, params), daemon=True
+                ).start()
+            return cached[1]
+
+    def get(
+        self,
+        url: str,
+        params: dict | None = None,
+        ttl: float = 0,
+        stale: float = 0,
+        force: bool = False,
+    ) -> dict:
+        """JSON body of a GET request, raises `requests.RequestException`.
+        With `force` the cached value is skipped but still replaced."""
+        if not ttl:
+            return self.fetch(url, params)
+        if not force and (data := self.get_fresh(url, params, ttl, stale)) is not None:
+            return data
+
+        data = self.fetch(url, params)
+        self.set_cached(self.get_key(url, params), data)
+        return data
+
+
+@cache
+def get_http_client() -> HttpClient:
+    return HttpClient()
@@ -0,0 +1,163 @@
+import json, os, threading, time
+from functools import cache
+from loguru import logger
+
+from config import JOURNAL_PATH
+from .rpc import rpc_batch
+from .fees import get_max_price
+from .txns_store import get_txns_store
+
+
+class Journal:
+    """Append-only log of every sent and mined txn, one JSON object per line.
+
+    Mined txns go to the txn history right away, so a restarted run knows
+    its progress without waiting for the explorer. Txns left pending by a
+    crash are looked up with one batched receipt query on the next start.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        # (address, nonce) -> sent events, one more per replacement
+        self.pending: dict[tuple[str, int], list[dict]] = {}
+        self.replay()
+        self.file = open(path, "a")
+
+    def replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as file:
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except ValueError:  # torn last line of a crash
+                    continue
+                key = (event["wallet"], event["nonce"])
+                if event["event"] == "sent":
+                    self.pending.setdefault(key, []).append(event)
+                else:
+                    self.pending.pop(key, None)
+
+    def write(self, event: dict):
+        self.file.write(json.dumps(event) + "\n")
+        self.file.flush()
+
+    def sent(self, address: str, txn: dict, hash: str, kind: str = ""):
+        """A replacement keeps the kind of the txn it replaces."""
+        key = (address, txn["nonce"])
+        with self.lock:
+            kind = kind or next((e["kind"] for e in self.pending.get(key, [])), "")
+        event = {
+            "event": "sent",
+            "wallet": address,
+            "nonce": txn["nonce"],
+            "hash": hash,
+            "kind": kind,
+            "value": txn.get("value", 0),
+            "gas_price": get_max_price(txn),
+            "time": time.time(),
+        }
+        with self.lock:
+            self.pending.setdefault(key, []).append(event)
+            self.write(event)
+
+    def mined(
+        self, address: str, nonce: int, receipt: dict, timestamp: int | None = None
+    ):
+        """Stores a successful txn with the history, then forgets the nonce.
+        `timestamp` is its block's, a receipt seen just now was mined now."""
+        hash = receipt["transactionHash"]
+        with self.lock:
+            sent = self.pending.pop((address, nonce), [])
+            event = next((e for e in sent if e["hash"] == hash), None)
+            event = event or {"kind": "", "value": 0, "gas_price": 0}
+            status = int(receipt["status"], 16)
+            gas_used = int(receipt["gasUsed"], 16)
+            gas_price = int(
+                receipt.get("effectiveGasPrice") or hex(event["gas_price"]), 16
+            )
+            store = get_txns_store()
+            if status == 1:
+                store.add_mined_txn(
+                    address,
+                    hash,
+                    int(receipt["blockNumber"], 16),
+                    timestamp or int(time.time()),
+                    event["value"],
+                    gas_used,
+                    gas_price,
+                    event["kind"],
+                )
+            store.advance_nonce(address, nonce)
+            self.write(
+                {
+                    "event": "mined",
+                    "wallet": address,
+                    "nonce": nonce,
+                    "hash": hash,
+                    "status": status,
+                    "fee": gas_used * gas_price,
+                    "time": time.time(),
+                }
+            )
+
+    def dropped(self, address: str, nonce: int):
+        with self.lock:
+            self.pending.pop((address, nonce), None)
+            self.write({"event": "dropped", "wallet": address, "nonce": nonce})
+
+    def resume(self):
+        """Reconciles txns left pending by the last run, then compacts the
+        journal down to the ones still pending."""
+        with self.lock:
+            sent = [event for events in self.pending.values() for event in events]
+        if sent:
+            addresses = list({event["wallet"] for event in sent})
+            try:
+                results = rpc_batch(
+                    [("eth_getTransactionReceipt", [e["hash"]]) for e in sent]
+                    + [("eth_getTransactionCount", [a, "latest"]) for a in addresses]
+                )
+                receipts = results[: len(sent)]
+                # mined before the restart, maybe on another day
+                numbers = list({r["blockNumber"] for r in receipts if r is not None})
+                blocks = dict(
+                    zip(
+                        numbers,
+                        rpc_batch(
+                            [("eth_getBlockByNumber", [n, False]) for n in numbers]
+                        ),
+                    )
+                )
+            except Exception as e:
+                return logger.error(f"Failed to check txns of the last run! {e}")
+            mined_nonces = dict(zip(addresses, results[len(sent) :]))
+
+            mined = 0
+            for event, receipt in zip(sent, receipts):
+                key = (event["wallet"], event["nonce"])
+                if receipt is not None and key in self.pending:
+                    block = blocks[receipt["blockNumber"]]
+                    self.mined(*key, receipt, int(block["timestamp"], 16))
+                    mined += 1
+            for address, nonce in list(self.pending):
+                if nonce < int(mined_nonces.get(address) or "0x0", 16):
+                    self.dropped(address, nonce)  # replaced by another txn
+            logger.info(
+                f"Txns from the last run: {mined} mined, "
+                f"{len(self.pending)} still pending"
+            )
+
+        with self.lock:
+            self.file.close()
+            with open(self.path + ".tmp", "w") as file:
+                for events in self.pending.values():
+                    file.writelines(json.dumps(event) + "\n" for event in events)
+            os.replace(self.path + ".tmp", self.path)
+            self.file = open(self.path, "a")
+
+
+@cache
+def get_journal() -> Journal:
+    return Journal()
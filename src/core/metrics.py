@@ -0,0 +1,203 @@
+import bisect, os, threading, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from urllib.parse import urlparse
+import tabulate
+from tqdm import tqdm
+
+from config import METRICS_PATH
+from settings import METRICS
+
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # in seconds
+
+current_wallet: ContextVar[str] = ContextVar("current_wallet", default="")
+current_module: ContextVar[str] = ContextVar("current_module", default="")
+
+
+@contextmanager
+def labels(wallet: str = "", module: str = ""):
+    """Attributes every request made inside the block (in this thread or
+    task) to the wallet and module."""
+    wallet_token = current_wallet.set(wallet)
+    module_token = current_module.set(module or current_module.get())
+    try:
+        yield
+    finally:
+        current_wallet.reset(wallet_token)
+        current_module.reset(module_token)
+
+
+@contextmanager
+def timer(kind: str, name: str):
+    """Observes the block's duration, an exception counts as an error."""
+    start, error = time.perf_counter(), False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(kind, name, time.perf_counter() - start, error)
+
+
+@dataclass
+class Metric:
+    count: int = 0
+    errors: int = 0
+    retries: int = 0
+    sent: int = 0  # in bytes
+    received: int = 0
+    seconds: float = 0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+
+    def add(self, other: "Metric"):
+        for name in ("count", "errors", "retries", "sent", "received", "seconds"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def quantile(self, q: float) -> str:
+        """Upper bound of the bucket holding the q-th quantile."""
+        rank, seen = q * sum(self.buckets), 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return f"≤{bound}s" if bound != float("inf") else f">{BUCKETS[-1]}s"
+        return "-"
+
+
+# (kind, name, module, wallet) -> Metric. Kinds: "rpc" — web3 method or
+# batch, "api" — explorer/Trailblazer/price endpoint (both including
+# retries), "http" — single HTTP requests per host, "txn" — waits for receipts
+registry: dict[tuple[str, str, str, str], Metric] = {}
+lock = threading.Lock()
+
+
+def get_metric(kind: str, name: str) -> Metric:
+    key = (kind, name, current_module.get(), current_wallet.get())
+    if key not in registry:
+        registry[key] = Metric()
+    return registry[key]
+
+
+def observe(
+    kind: str,
+    name: str,
+    seconds: float,
+    error: bool = False,
+    sent: int = 0,
+    received: int = 0,
+):
+    with lock:
+        metric = get_metric(kind, name)
+        metric.count += 1
+        metric.errors += error
+        metric.sent += sent
+        metric.received += received
+        metric.seconds += seconds
+        metric.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+
+def observe_retry(kind: str, name: str):
+    with lock:
+        get_metric(kind, name).retries += 1
+
+
+def observe_response(response, *args, **kwargs):
+    """`requests` response hook, HTTP-level stats per host."""
+    body = response.request.body or b""
+    observe(
+        "http",
+        urlparse(response.url).netloc,
+        response.elapsed.total_seconds(),
+        error=response.status_code >= 400,
+        sent=len(body),
+        received=len(response.content),
+    )
+
+
+def get_summary() -> list[dict]:
+    by_name: dict[tuple[str, str, str], Metric] = {}
+    with lock:
+        for (kind, name, module, _), metric in registry.items():
+            by_name.setdefault((module, kind, name), Metric()).add(metric)
+    return [
+        {
+            "Module": module or "-",
+            "Kind": kind,
+            "Name": name,
+            "Calls": metric.count,
+            "Errors": metric.errors,
+            "Retries": metric.retries,
+            "Avg (ms)": f"{metric.seconds / (metric.count or 1) * 1000:.0f}",
+            "p50": metric.quantile(0.5),
+            "p99": metric.quantile(0.99),
+            "Total (s)": f"{metric.seconds:.1f}",
+            "KB out|in": f"{metric.sent / 1024:,.0f}|{metric.received / 1024:,.0f}",
+        }
+        for (module, kind, name), metric in sorted(
+            by_name.items(), key=lambda item: -item[1].seconds
+        )
+    ]
+
+
+def format_labels(kind: str, name: str, module: str, wallet: str, **extra) -> str:
+    values = {"kind": kind, "name": name, "module": module, "wallet": wallet, **extra}
+    return ",".join(f'{k}="{v}"' for k, v in values.items())
+
+
+def write_textfile(path: str = METRICS_PATH):
+    """Prometheus text format, for node_exporter's textfile collector."""
+    counters = {
+        "taiko_requests_total": "count",
+        "taiko_request_errors_total": "errors",
+        "taiko_request_retries_total": "retries",
+        "taiko_request_sent_bytes_total": "sent",
+        "taiko_request_received_bytes_total": "received",
+    }
+    with lock:
+        items = [
+            (key, replace(metric, buckets=list(metric.buckets)))
+            for key, metric in registry.items()
+        ]
+
+    lines = []
+    for metric_name, attr in counters.items():
+        lines.append(f"# TYPE {metric_name} counter")
+        for key, metric in items:
+            lines.append(
+                f"{metric_name}{{{format_labels(*key)}}} {getattr(metric, attr)}"
+            )
+    lines.append("# TYPE taiko_request_duration_seconds histogram")
+    for key, metric in items:
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), metric.buckets):
+            cumulative += count
+            lines.append(
+                "taiko_request_duration_seconds_bucket"
+                f"{{{format_labels(*key, le=bound)}}} {cumulative}"
+            )
+        lines.append(
+            f"taiko_request_duration_seconds_sum{{{format_labels(*key)}}} "
+            f"{metric.seconds}"
+        )
+        lines.append(
+            f"taiko_request_duration_seconds_count{{{format_labels(*key)}}} "
+            f"{metric.count}"
+        )
+
+    with open(path + ".tmp", "w") as file:
+        file.write("\n".join(lines) + "\n")
+    os.replace(path + ".tmp", path)  # scrapers never see a partial file
+
+
+def report():
+    """Prints this run's request stats, saves them to METRICS_PATH and
+    starts counting from zero for the next run."""
+    if METRICS and registry:
+        tqdm.write(
+            tabulate.tabulate(get_summary(), headers="keys", tablefmt="rounded_grid")
+        )
+        write_textfile()
+    with lock:
+        registry.clear()
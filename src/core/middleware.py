@@ -0,0 +1,14 @@
+from web3.middleware import Web3Middleware
+
+from .metrics import timer
+
+
+class MetricsMiddleware(Web3Middleware):
+    """Calls, errors and latency (retries included) per JSON-RPC method."""
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            with timer("rpc", method):
+                return make_request(method, params)
+
+        return middleware
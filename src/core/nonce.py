@@ -0,0 +1,26 @@
+import threading
+
+
+class NonceManager:
+    """Hands out consecutive nonces without asking the node every time.
+    Synced from the pending transaction count on first use and after reset."""
+
+    def __init__(self, w3, address: str):
+        self.w3 = w3
+        self.address = address
+        self.next_nonce: int | None = None
+        self.lock = threading.Lock()
+
+    def reserve(self, count: int = 1) -> list[int]:
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.w3.eth.get_transaction_count(
+                    self.address, "pending"
+                )
+            nonces = list(range(self.next_nonce, self.next_nonce + count))
+            self.next_nonce += count
+            return nonces
+
+    def reset(self):
+        with self.lock:
+            self.next_nonce = None
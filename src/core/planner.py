@@ -0,0 +1,49 @@
+import datetime, math
+from loguru import logger
+
+from config import GAS_SPENT_COEF
+from settings import SLEEP_BETWEEN_TXNS
+from .wallet import Wallet, TxnResult
+from .fees import get_fee_oracle, set_price
+
+MAX_TXN_FEE = int(GAS_SPENT_COEF * 1000 * 10**18)  # fee that earns the 1000 pts cap
+CONFIRMATION_TIME = 10  # in seconds, used until real txns are confirmed
+
+gas_used: dict[str, int] = {}  # last gasUsed per txn kind, shared by all wallets
+durations: list[float] = []
+
+
+class GasPlanner:
+    """Prices every txn so its fee lands at the per-txn points cap, which
+    reaches 73k gas points in the fewest transactions."""
+
+    def __init__(self, wallet: Wallet):
+        self.wallet = wallet
+
+    def plan(self, txn: dict, kind: str, remaining_pts: float) -> dict:
+        target_fee = MAX_TXN_FEE * min(remaining_pts, 1000) / 1000
+        gas = gas_used.get(kind, txn["gas"])
+        price = int(target_fee / gas) + 1
+        set_price(txn, max(price, get_fee_oracle().get_min_price()))
+        return txn
+
+    def record(self, kind: str, result: TxnResult):
+        gas_used[kind] = result.gas_used
+        durations.append(result.duration)
+
+    def log_plan(self, txns_count: int, batch_size: int = 1):
+        confirmation_time = (
+            sum(durations) / len(durations) if durations else CONFIRMATION_TIME
+        )
+        batches = math.ceil(txns_count / batch_size)
+        seconds = batches * confirmation_time + (batches - 1) * (
+            sum(SLEEP_BETWEEN_TXNS) / 2
+        )
+        logger.info(
+            f"{self.wallet.info} Gas planner: ~{txns_count} txns, "
+            f"~{datetime.timedelta(seconds=round(max(seconds, 0)))} to reach 73k"
+        )
+
+    @staticmethod
+    def get_txns_count(remaining_pts: float, pts_per_txn: float = 1000) -> int:
+        return math.ceil(max(remaining_pts, 0) / pts_per_txn)
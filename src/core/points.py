@@ -0,0 +1,67 @@
+import datetime
+import numpy as np
+
+from config import GAS_SPENT_COEF, VOLUME_COEF
+
+
+class TxnFrame:
+    """Transaction history as columns (timestamp, burned fee and value in
+    ETH), so every metric and time window is one vectorized pass."""
+
+    def __init__(self, timestamps: np.ndarray, fees: np.ndarray, values: np.ndarray):
+        self.timestamps = timestamps
+        self.fees = fees
+        self.values = values
+
+    @classmethod
+    def from_columns(
+        cls, timestamps: list[int], fees: list[int], values: list[int]
+    ) -> "TxnFrame":
+        return cls(
+            np.array(timestamps, dtype=np.int64),
+            np.array(fees, dtype=np.float64) / 10**18,
+            np.array(values, dtype=np.float64) / 10**18,
+        )
+
+    @classmethod
+    def concat(cls, frames: list["TxnFrame"]) -> "TxnFrame":
+        if not frames:
+            return cls.from_columns([], [], [])
+        return cls(
+            np.concatenate([frame.timestamps for frame in frames]),
+            np.concatenate([frame.fees for frame in frames]),
+            np.concatenate([frame.values for frame in frames]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def since(self, timestamp: float) -> "TxnFrame":
+        mask = self.timestamps > timestamp
+        return TxnFrame(self.timestamps[mask], self.fees[mask], self.values[mask])
+
+    def gas_spent_eth(self) -> float:
+        return float(self.fees.sum())
+
+    def txn_gas_spent_pts(self) -> np.ndarray:
+        return np.minimum(self.fees / GAS_SPENT_COEF, 1000)
+
+    def txn_volume_pts(self) -> np.ndarray:
+        return np.minimum(self.values / VOLUME_COEF, 1000)
+
+    def gas_spent_pts(self) -> float:
+        return float(self.txn_gas_spent_pts().sum())
+
+    def volume_pts(self) -> float:
+        return float(self.txn_volume_pts().sum())
+
+    def daily_pts(self) -> dict[datetime.date, tuple[float, float]]:
+        """Gas and volume points per UTC day over the whole history."""
+        days, inverse = np.unique(self.timestamps // 86400, return_inverse=True)
+        gas_pts = np.bincount(inverse, weights=self.txn_gas_spent_pts())
+        volume_pts = np.bincount(inverse, weights=self.txn_volume_pts())
+        epoch = datetime.date(1970, 1, 1)
+        return {
+            epoch + datetime.timedelta(days=int(day)): (float(gas), float(volume))
+            for day, gas, volume in zip(days, gas_pts, volume_pts)
+        }
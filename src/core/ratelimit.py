@@ -0,0 +1,145 @@
+import asyncio, random, threading, time, requests
+from functools import cache
+from urllib.parse import urlparse
+from loguru import logger
+
+from settings import (
+    RPC,
+    RPC_RATE_LIMIT,
+    HOST_RATE_LIMITS,
+    DEFAULT_RATE_LIMIT,
+    HTTP_RETRY_COUNT,
+    BACKOFF,
+)
+from .metrics import observe_retry
+
+
+class RateLimitError(requests.RequestException):
+    """HTTP 429 or an API body saying the rate limit was reached."""
+
+
+class TokenBucket:
+    """Blocking token bucket shared between threads.
+
+    The rate adapts AIMD-style: halved whenever the host reports a rate
+    limit and raised by 5% of the budget after every success, so it settles
+    at the highest rate the host sustains without going over `max_rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = self.max_rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Takes the tokens and returns 0, or returns how long to wait."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        while wait := self.try_acquire(tokens):
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1):
+        while wait := self.try_acquire(tokens):
+            await asyncio.sleep(wait)
+
+    def slow_down(self):
+        with self.lock:
+            self.rate = max(self.rate / 2, self.max_rate / 20)
+            self.tokens = min(self.tokens, 0)
+
+    def speed_up(self):
+        with self.lock:
+            self.rate = min(self.rate + self.max_rate * 0.05, self.max_rate)
+
+
+def get_host(url: str) -> str:
+    return urlparse(url).netloc
+
+
+def get_rpc_urls() -> list[str]:
+    return [RPC] if isinstance(RPC, str) else list(RPC)
+
+
+@cache
+def get_limiter(host: str) -> TokenBucket:
+    if host in {get_host(url) for url in get_rpc_urls()}:
+        return TokenBucket(RPC_RATE_LIMIT)
+    return TokenBucket(HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT))
+
+
+def backoff(attempt: int) -> float:
+    """Jittered exponential delay before retry number `attempt` (from 1)."""
+    base, cap = BACKOFF
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(0.5, 1)
+
+
+def is_rate_limit(e: Exception) -> bool:
+    if isinstance(e, RateLimitError):
+        return True
+    response = getattr(e, "response", None)
+    return response is not None and response.status_code == 429
+
+
+def is_retryable(e: Exception) -> bool:
+    if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(e, "response", None)
+    return is_rate_limit(e) or (response is not None and response.status_code >= 500)
+
+
+def get_retry_delay(
+    host: str, e: Exception, attempt: int, idempotent: bool = True
+) -> float:
+    """Backoff before the next attempt after `e`, raises `e` if it isn't
+    retried. Rate limits, timeouts, connection and 5xx errors are; for
+    non-idempotent calls only rate limits are, since those are rejected
+    before the request is processed."""
+    retryable = is_rate_limit(e) if not idempotent else is_retryable(e)
+    if not retryable or attempt > HTTP_RETRY_COUNT:
+        raise e
+    if is_rate_limit(e):
+        get_limiter(host).slow_down()
+    observe_retry("http", host)
+    delay = backoff(attempt)
+    logger.debug(f"{host} request failed ({e}), retrying in {delay:.1f}s")
+    return delay
+
+
+def call_with_retries(host: str, func, *args, idempotent: bool = True):
+    """Calls `func` under the host's rate limit, retried with backoff."""
+    limiter = get_limiter(host)
+    for attempt in range(1, HTTP_RETRY_COUNT + 2):
+        limiter.acquire()
+        try:
+            result = func(*args)
+        except Exception as e:
+            time.sleep(get_retry_delay(host, e, attempt, idempotent))
+        else:
+            limiter.speed_up()
+            return result
+
+
+async def call_with_retries_async(host: str, func, *args, idempotent: bool = True):
+    """`call_with_retries` for a coroutine function."""
+    limiter = get_limiter(host)
+    for attempt in range(1, HTTP_RETRY_COUNT + 2):
+        await limiter.acquire_async()
+        try:
+            result = await func(*args)
+        except Exception as e:
+            await asyncio.sleep(get_retry_delay(host, e, attempt, idempotent))
+        else:
+            limiter.speed_up()
+            return result
@@ -0,0 +1,78 @@
+import json
+from functools import cache
+
+from config import WETH_CONTRACT_ADDRESS, RUBYSCORE_CONTRACT_ADDRESS, load_abi
+from settings import RPC_BATCH_SIZE
+from .rpc_pool import get_pool
+from .metrics import timer
+
+CONTRACT_ABIS = {
+    WETH_CONTRACT_ADDRESS: "weth",
+    RUBYSCORE_CONTRACT_ADDRESS: "rubyscore",
+}
+
+
+@cache
+def get_w3():
+    """Process-wide Web3 instance shared by every wallet. web3 is imported
+    here, on first use, since it is most of the app's import time."""
+    from web3 import Web3
+    from web3.providers import JSONBaseProvider
+    from .middleware import MetricsMiddleware
+
+    class PoolProvider(JSONBaseProvider):
+        """Sends web3 requests through the RPC pool, which also retries them."""
+
+        def make_request(self, method, params):
+            payload = json.loads(self.encode_rpc_request(method, params))
+            return get_pool().request(
+                payload, idempotent=method != "eth_sendRawTransaction"
+            )
+
+    w3 = Web3(PoolProvider())
+    w3.middleware_onion.add(MetricsMiddleware, "metrics")
+    return w3
+
+
+@cache
+def get_contract(address: str):
+    return get_w3().eth.contract(address=address, abi=load_abi(CONTRACT_ABIS[address]))
+
+
+@cache
+def get_chain_id() -> int:
+    return get_w3().eth.chain_id
+
+
+def make_payload(calls: list[tuple[str, list]]) -> list[dict]:
+    return [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+
+
+def parse_response(data: list[dict] | dict) -> list:
+    if isinstance(data, dict):  # whole batch rejected by the node
+        raise Exception(f"RPC batch failed: {data.get('error', data)}")
+    results = []
+    for item in sorted(data, key=lambda x: x["id"]):
+        if "error" in item:
+            raise Exception(f"RPC batch call failed: {item['error']}")
+        results.append(item["result"])
+    return results
+
+
+def chunks(calls: list, size: int = RPC_BATCH_SIZE) -> list[list]:
+    return [calls[i : i + size] for i in range(0, len(calls), size)]
+
+
+def get_batch_name(chunk: list[tuple[str, list]]) -> str:
+    return "batch:" + "+".join(sorted({method for method, _ in chunk}))
+
+
+def rpc_batch(calls: list[tuple[str, list]]) -> list:
+    results = []
+    for chunk in chunks(calls):
+        with timer("rpc", get_batch_name(chunk)):
+            results.extend(parse_response(get_pool().request(make_payload(chunk))))
+    return results
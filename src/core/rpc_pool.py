@@ -0,0 +1,166 @@
+import time, threading, requests
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, as_completed
+from functools import cache
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from settings import RPC_POOL_SIZE, RPC_HEDGE_AFTER, RPC_BROADCAST, HTTP_RETRY_COUNT
+from .ratelimit import (
+    RateLimitError,
+    get_host,
+    get_limiter,
+    get_rpc_urls,
+    backoff,
+    is_rate_limit,
+    is_retryable,
+)
+from .metrics import observe_response, observe_retry
+
+EWMA_ALPHA = 0.2  # weight of the newest sample in latency and error averages
+MAX_FAILURES = 3  # failures in a row before an endpoint is benched
+COOLDOWN = 30  # in seconds, how long a failing endpoint is benched
+
+
+@cache
+def get_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=RPC_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(observe_response)
+    return session
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self.host = get_host(url)
+        self.latency = 0.0  # EWMA in seconds, 0 until the first answer
+        self.error_rate = 0.0  # EWMA of failed requests
+        self.failures = 0  # in a row
+        self.benched_until = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.benched_until
+
+    @property
+    def score(self) -> float:
+        """Expected latency, errors make an endpoint look slower."""
+        return self.latency * (1 + 10 * self.error_rate)
+
+    def record(self, latency: float, error: bool = False):
+        with self.lock:
+            if not error:
+                self.latency += (
+                    EWMA_ALPHA * (latency - self.latency) if self.latency else latency
+                )
+            self.error_rate += EWMA_ALPHA * (error - self.error_rate)
+            self.failures = self.failures + 1 if error else 0
+            if self.failures >= MAX_FAILURES:
+                self.failures = 0
+                self.benched_until = time.monotonic() + COOLDOWN
+                logger.warning(
+                    f"RPC {self.host} keeps failing, benched for {COOLDOWN}s"
+                )
+
+
+class RpcPool:
+    """All RPC traffic goes to the fastest healthy endpoint. A read that is
+    still unanswered after RPC_HEDGE_AFTER is also sent to the next best
+    endpoint and the first answer wins; failed reads fail over right away.
+    Signed transactions are sent to the RPC_BROADCAST best endpoints."""
+
+    def __init__(self, urls: list[str]):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.executor = ThreadPoolExecutor(max_workers=RPC_POOL_SIZE)
+
+    def submit(self, endpoint: Endpoint, payload: dict | list):
+        # the copied context keeps the metrics labels of the calling wallet
+        return self.executor.submit(copy_context().run, self.send, endpoint, payload)
+
+    def ranked(self) -> list[Endpoint]:
+        return sorted(self.endpoints, key=lambda e: (not e.healthy, e.score))
+
+    def send(self, endpoint: Endpoint, payload: dict | list) -> dict | list:
+        limiter = get_limiter(endpoint.host)
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            r = get_session().post(endpoint.url, json=payload, timeout=30)
+            if r.status_code == 429:
+                raise RateLimitError(f"Rate limit reached: {r.text[:100]}", response=r)
+            r.raise_for_status()
+            data = r.json()
+        except Exception as e:
+            endpoint.record(time.perf_counter() - start, error=True)
+            if is_rate_limit(e):
+                limiter.slow_down()
+            raise
+        endpoint.record(time.perf_counter() - start)
+        limiter.speed_up()
+        return data
+
+    def hedged(self, payload: dict | list) -> dict | list:
+        endpoints = self.ranked()
+        if len(endpoints) == 1:
+            return self.send(endpoints[0], payload)
+
+        pending, error = set(), None
+        for endpoint in endpoints:
+            pending.add(self.submit(endpoint, payload))
+            done, pending = wait(
+                pending, timeout=RPC_HEDGE_AFTER or None, return_when=FIRST_COMPLETED
+            )
+            if not done:  # a lower bound until it answers, so it's ranked down now
+                endpoint.record(RPC_HEDGE_AFTER)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            # still slow or failed, also ask the next endpoint
+        for future in as_completed(pending):
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        raise error
+
+    def broadcast(self, payload: dict) -> dict:
+        """First response with a result, otherwise the last error response.
+        Other endpoints rejecting an already known txn doesn't matter."""
+        futures = [
+            self.submit(endpoint, payload) for endpoint in self.ranked()[:RPC_BROADCAST]
+        ]
+        response, error = None, None
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                error = future.exception()
+            elif "result" in future.result():
+                return future.result()
+            else:
+                response = future.result()
+        if response is None:
+            raise error
+        return response
+
+    def request(self, payload: dict | list, idempotent: bool = True) -> dict | list:
+        """Retried with backoff once every endpoint failed. Non-idempotent
+        requests are only retried on rate limits, like `call_with_retries`."""
+        for attempt in range(1, HTTP_RETRY_COUNT + 2):
+            try:
+                return self.hedged(payload) if idempotent else self.broadcast(payload)
+            except Exception as e:
+                retryable = is_retryable(e) if idempotent else is_rate_limit(e)
+                if not retryable or attempt > HTTP_RETRY_COUNT:
+                    raise
+                observe_retry("http", "rpc")
+                delay = backoff(attempt)
+                logger.debug(f"RPC request failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+@cache
+def get_pool() -> RpcPool:
+    return RpcPool(get_rpc_urls())
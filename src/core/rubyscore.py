@@ -1,65 +1,97 @@
+import math
 from loguru import logger
 
 from web3.contract import Contract
 
 from .wallet import Wallet
+from .rpc import get_contract
 from .checker import Checker
-from .utils import sleep
-from config import RUBYSCORE_CONTRACT_ADDRESS, RUBYSCORE_CONTRACT_ABI
-from settings import RETRY_COUNT, SLEEP_BETWEEN_TXNS
+from .planner import GasPlanner
+from .templates import build_txn, invalidate
+from .utils import sleep, sleep_backoff
+from config import RUBYSCORE_CONTRACT_ADDRESS
+from settings import (
+    RETRY_COUNT,
+    SLEEP_BETWEEN_TXNS,
+    PIPELINE_SIZE,
+    GAS_PLANNER,
+    MAX_INFLIGHT_TXNS,
+)
 
 
 class Rubyscore:
     def __init__(self, wallet: Wallet):
         self.wallet = wallet
-        self.contract: Contract = self.wallet.w3.eth.contract(
-            address=RUBYSCORE_CONTRACT_ADDRESS, abi=RUBYSCORE_CONTRACT_ABI
-        )
+        self.contract: Contract = get_contract(RUBYSCORE_CONTRACT_ADDRESS)
+        self.planner = GasPlanner(wallet) if GAS_PLANNER else None
+        self.gas_spent_pts = 0
 
-    def vote(self):
-        logger.info(f"{self.wallet.info} Voting on Rubyscore...")
-        txn = self.contract.functions.vote().build_transaction(
-            self.wallet.get_txn_data()
-        )
-        return self.wallet.send_txn(txn)
+    def vote(self, count: int = 1) -> list:
+        if count == 1:
+            logger.info(f"{self.wallet.info} Voting on Rubyscore...")
+        else:
+            logger.info(f"{self.wallet.info} Sending {count} votes on Rubyscore...")
+        txn = build_txn(self.wallet, self.contract, "vote")
+        if self.planner:
+            self.planner.plan(txn, "vote", 73000 - self.gas_spent_pts)
+        if count == 1:
+            return [self.wallet.send_txn(txn, "vote")]
+        return self.wallet.send_txns([dict(txn) for _ in range(count)], "vote")
 
-    def try_vote(self):
+    def try_vote(self, count: int = 1) -> list:
         for attempt in range(1, RETRY_COUNT + 1):
             try:
-                result = self.vote()
-                if result not in (None, False):
-                    return result
+                results = [r for r in self.vote(count) if r not in (None, False)]
+                if results:
+                    return results
                 else:
                     raise Exception
             except Exception as e:
                 logger.error(f"{self.wallet.info} Vote attempt {attempt} failed!")
                 logger.debug(e)
+                invalidate(self.wallet, self.contract, "vote")
+                if attempt < RETRY_COUNT:
+                    sleep_backoff(attempt)
         logger.critical(f"{self.wallet.info} All vote attempts failed!")
+        return []
+
+    def get_batch_size(self, vote_pts: float | None) -> int:
+        size = min(PIPELINE_SIZE, MAX_INFLIGHT_TXNS)  # one in-flight slot per vote
+        if vote_pts is None:
+            return size
+        return max(1, min(size, math.ceil((73000 - self.gas_spent_pts) / vote_pts)))
 
     def run(self):
-        txns = Checker.filter_today_txns(Checker.get_txns(self.wallet))
-        gas_spent_pts = Checker.get_gas_spent_pts(txns)
-        if gas_spent_pts >= 73000:
+        nonce = self.wallet.get_state().nonce
+        txns = Checker.filter_today_txns(Checker.get_txns(self.wallet, nonce))
+        self.gas_spent_pts = Checker.get_gas_spent_pts(txns)
+        if self.gas_spent_pts >= 73000:
             return logger.warning(
                 f"{self.wallet.info} Wallet already have 73k gas spent points!"
             )
+        if self.planner:
+            self.planner.log_plan(
+                GasPlanner.get_txns_count(73000 - self.gas_spent_pts), PIPELINE_SIZE
+            )
         i = 0
+        vote_pts = None
 
         while True:
-            vote_success = self.try_vote()
-            if vote_success:
-                gas_spent_pts += Checker.get_txn_gas_spent_pts(
-                    self.wallet.get_txn_cost(vote_success)
-                )
-            else:
+            votes = self.try_vote(self.get_batch_size(vote_pts))
+            if not votes:
                 break
 
-            i += 1
-            logger.success(f"{self.wallet.info} Successfully voted on Rubyscore!")
+            for vote in votes:
+                vote_pts = Checker.get_txn_gas_spent_pts(vote.fee_eth)
+                self.gas_spent_pts += vote_pts
+                if self.planner:
+                    self.planner.record("vote", vote)
+                i += 1
+                logger.success(f"{self.wallet.info} Successfully voted on Rubyscore!")
             logger.debug(
-                f"{self.wallet.info} Times voted: {i} | Gas progress: {gas_spent_pts/73000*100:.1f}%"
+                f"{self.wallet.info} Times voted: {i} | Gas progress: {self.gas_spent_pts/73000*100:.1f}%"
             )
 
-            if gas_spent_pts >= 73000:
+            if self.gas_spent_pts >= 73000:
                 break
             sleep(*SLEEP_BETWEEN_TXNS)
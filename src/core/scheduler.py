@@ -0,0 +1,56 @@
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from loguru import logger
+
+from settings import MAX_CONCURRENT_WALLETS, SLEEP_BETWEEN_WALLETS
+from .utils import sleep, stop_event
+from .wallet import Wallet
+from .journal import get_journal
+from . import metrics, signer
+
+
+class Scheduler:
+    """Runs a module over many wallets at once. Every worker keeps the usual
+    SLEEP_BETWEEN_WALLETS pause between its own wallets, and workers start
+    at random offsets so their timelines don't line up."""
+
+    def __init__(self, module: type, wallets: list[Wallet]):
+        self.module = module
+        self.wallets = wallets
+
+    def get_start_delay(self, position: int) -> int:
+        if position == 0:
+            return 0
+        if position < MAX_CONCURRENT_WALLETS:
+            return random.randint(0, SLEEP_BETWEEN_WALLETS[1])
+        return random.randint(*SLEEP_BETWEEN_WALLETS)
+
+    def run_wallet(self, wallet: Wallet, position: int):
+        delay = self.get_start_delay(position)
+        if delay:
+            sleep(delay, delay)
+        try:
+            with metrics.labels(wallet.address, self.module.__name__):
+                self.module(wallet).run()
+        except Exception as e:
+            return logger.critical(f"{wallet.info} {e}")
+        logger.success(f"{wallet.info} Wallet completed 🏁")
+
+    def run(self):
+        signer.start()
+        get_journal().resume()
+        executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_WALLETS)
+        futures = [
+            executor.submit(self.run_wallet, wallet, position)
+            for position, wallet in enumerate(self.wallets)
+        ]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except KeyboardInterrupt:
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            metrics.report()
+        executor.shutdown()
@@ -0,0 +1,85 @@
+import multiprocessing, threading, time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import cache
+
+from settings import SIGNER_PROCESSES
+
+BATCH_WINDOW = 0.005  # in seconds, how long sign requests are gathered
+BATCH_SIZE = 50  # txns sent to a worker process at once
+
+
+def sign_txns(txns: list[tuple[dict, str]]) -> list[bytes]:
+    """Runs in the worker processes, so it keeps module imports light."""
+    from eth_account import Account
+
+    return [
+        bytes(Account.sign_transaction(txn, private_key).raw_transaction)
+        for txn, private_key in txns
+    ]
+
+
+class BatchSigner:
+    """Signs the txns of every wallet thread in a process pool, so ECDSA
+    and RLP encoding run outside the GIL. Requests arriving within
+    BATCH_WINDOW of each other share one round trip to a worker."""
+
+    def __init__(self, processes: int = SIGNER_PROCESSES):
+        self.executor = ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.pending: list[tuple[dict, str, Future]] = []
+        self.lock = threading.Lock()
+        self.has_pending = threading.Event()
+        threading.Thread(target=self.run, daemon=True).start()
+        for _ in range(processes):  # spawns workers and imports eth_account now
+            self.executor.submit(sign_txns, [])
+
+    def sign(self, txns: list[dict], private_key: str) -> list[bytes]:
+        futures = [Future() for _ in txns]
+        with self.lock:
+            self.pending.extend(
+                (txn, private_key, future) for txn, future in zip(txns, futures)
+            )
+            self.has_pending.set()
+        return [future.result() for future in futures]
+
+    def run(self):
+        while True:
+            self.has_pending.wait()
+            time.sleep(BATCH_WINDOW)
+            with self.lock:
+                batch, self.pending = self.pending, []
+                self.has_pending.clear()
+            for i in range(0, len(batch), BATCH_SIZE):
+                chunk = batch[i : i + BATCH_SIZE]
+                self.executor.submit(
+                    sign_txns, [(txn, key) for txn, key, _ in chunk]
+                ).add_done_callback(
+                    lambda result, chunk=chunk: self.resolve(chunk, result)
+                )
+
+    @staticmethod
+    def resolve(chunk: list[tuple[dict, str, Future]], result: Future):
+        if result.exception() is not None:
+            for *_, future in chunk:
+                future.set_exception(result.exception())
+            return
+        for (*_, future), raw in zip(chunk, result.result()):
+            future.set_result(raw)
+
+
+@cache
+def get_signer() -> BatchSigner:
+    return BatchSigner()
+
+
+def start():
+    """Workers take seconds to spawn, better to start them with the run."""
+    if SIGNER_PROCESSES:
+        get_signer()
+
+
+def sign(txns: list[dict], private_key: str) -> list[bytes]:
+    if not SIGNER_PROCESSES:
+        return sign_txns([(txn, private_key) for txn in txns])
+    return get_signer().sign(txns, private_key)
@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+
+from config import WETH_CONTRACT_ADDRESS
+from .rpc import rpc_batch
+
+BALANCE_OF_SELECTOR = "0x70a08231"
+
+
+@dataclass
+class WalletState:
+    eth_balance: int
+    weth_balance: int  # in wei, like eth_balance
+    nonce: int
+
+
+def get_state_calls(address: str) -> list[tuple[str, list]]:
+    return [
+        ("eth_getBalance", [address, "latest"]),
+        (
+            "eth_call",
+            [
+                {
+                    "to": WETH_CONTRACT_ADDRESS,
+                    "data": BALANCE_OF_SELECTOR + address[2:].lower().rjust(64, "0"),
+                },
+                "latest",
+            ],
+        ),
+        ("eth_getTransactionCount", [address, "latest"]),
+    ]
+
+
+def to_int(value: str) -> int:
+    return int(value, 16) if value not in (None, "0x") else 0
+
+
+def parse_states(addresses: list[str], results: list) -> dict[str, WalletState]:
+    states = {}
+    for i, address in enumerate(addresses):
+        eth_balance, weth_balance, nonce = results[i * 3 : i * 3 + 3]
+        states[address] = WalletState(
+            eth_balance=to_int(eth_balance),
+            weth_balance=to_int(weth_balance),
+            nonce=to_int(nonce),
+        )
+    return states
+
+
+def get_states(addresses: list[str]) -> dict[str, WalletState]:
+    """ETH balance, WETH balance and nonce of every address in
+    ~3N/RPC_BATCH_SIZE JSON-RPC batch requests."""
+    calls = [call for address in addresses for call in get_state_calls(address)]
+    return parse_states(addresses, rpc_batch(calls))
@@ -0,0 +1,59 @@
+import time
+from dataclasses import dataclass
+
+from .wallet import Wallet
+
+GAS_TTL = 600  # in seconds, how long a wallet's gas estimate is reused
+GAS_BUFFER = 1.2  # gas limit over the estimate, unused gas isn't charged
+
+
+@dataclass
+class GasEstimate:
+    gas: int
+    estimated_at: float
+
+
+# (contract address, function) -> calldata of functions without arguments,
+# the same for every wallet
+calldata: dict[tuple[str, str], str] = {}
+# gas depends on the caller's storage, e.g. a WETH deposit from a zero
+# balance costs ~17k more than a top-up, so every wallet estimates its own
+# (contract address, function, wallet address) -> estimate
+estimates: dict[tuple[str, str, str], GasEstimate] = {}
+# (contract address, function) -> highest gas of any wallet, the floor for
+# all of them, so a wallet whose storage changed since its estimate is covered
+highest: dict[tuple[str, str], int] = {}
+
+
+def get_data(contract, function: str, args: tuple = ()) -> str:
+    if args:
+        return contract.encode_abi(function, args)
+    key = (contract.address, function)
+    if key not in calldata:
+        calldata[key] = contract.encode_abi(function)
+    return calldata[key]
+
+
+def build_txn(
+    wallet: Wallet, contract, function: str, args: tuple = (), value: int = 0
+) -> dict:
+    """Like `build_transaction`, but calldata is encoded once per contract
+    function and gas estimated once per wallet and function, not per txn."""
+    txn = {
+        **wallet.get_txn_data(value),
+        "to": contract.address,
+        "data": get_data(contract, function, args),
+    }
+    key = (contract.address, function, wallet.address)
+    estimate = estimates.get(key)
+    if not estimate or time.time() - estimate.estimated_at >= GAS_TTL:
+        gas = int(wallet.w3.eth.estimate_gas(txn) * GAS_BUFFER)
+        estimate = estimates[key] = GasEstimate(gas, time.time())
+        highest[key[:2]] = max(highest.get(key[:2], 0), gas)
+    txn["gas"] = max(estimate.gas, highest[key[:2]])
+    return txn
+
+
+def invalidate(wallet: Wallet, contract, function: str):
+    """Drops the wallet's estimate after a failed txn, its gas may be too low."""
+    estimates.pop((contract.address, function, wallet.address), None)
@@ -0,0 +1,199 @@
+import sqlite3, threading, time
+from functools import cache
+
+from config import TXNS_DB_PATH, EXPLORER_LAG
+from .explorer import Txn
+from .points import TxnFrame
+from .state import WalletState
+
+
+class TxnsStore:
+    """Filtered explorer history per address plus the last synced block, so
+    repeat syncs only ask the explorer for new blocks.
+
+    Also keeps the last seen nonce and balances of every address with when
+    they changed and when the explorer was last synced, so the checker can
+    tell which wallets have nothing new to fetch.
+    """
+
+    def __init__(self, path: str = TXNS_DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync ("
+                "address TEXT PRIMARY KEY, last_block INTEGER NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS txns ("
+                "hash TEXT PRIMARY KEY, address TEXT NOT NULL, "
+                "block_number INTEGER NOT NULL, time_stamp INTEGER NOT NULL, "
+                "value TEXT NOT NULL, gas_used INTEGER NOT NULL, "
+                "gas_price INTEGER NOT NULL, function_name TEXT NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS txns_address "
+                "ON txns (address, block_number)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "address TEXT PRIMARY KEY, nonce INTEGER NOT NULL, "
+                "eth_balance TEXT NOT NULL, weth_balance TEXT NOT NULL, "
+                "changed_at REAL NOT NULL, synced_at REAL NOT NULL)"
+            )
+
+    def get_last_block(self, address: str) -> int:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_block FROM sync WHERE address = ?", (address,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def add_txns(self, address: str, txns: list[Txn], last_block: int):
+        """Explorer rows replace the ones of `add_mined_txn`."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO txns VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        txn.hash,
+                        address,
+                        txn.block_number,
+                        txn.time_stamp,
+                        str(txn.value),
+                        txn.gas_used,
+                        txn.gas_price,
+                        txn.function_name,
+                    )
+                    for txn in txns
+                ],
+            )
+            self.conn.execute(
+                "INSERT INTO sync VALUES (?, ?) ON CONFLICT (address) "
+                "DO UPDATE SET last_block = MAX(last_block, excluded.last_block)",
+                (address, last_block),
+            )
+
+    def add_mined_txn(
+        self,
+        address: str,
+        hash: str,
+        block_number: int,
+        time_stamp: int,
+        value: int,
+        gas_used: int,
+        gas_price: int,
+        function_name: str,
+    ):
+        """Our own txn, known from its receipt before the explorer lists it.
+        The synced block stays put, earlier blocks may not be synced yet."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO txns VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    hash,
+                    address,
+                    block_number,
+                    time_stamp,
+                    str(value),
+                    gas_used,
+                    gas_price,
+                    function_name,
+                ),
+            )
+
+    def advance_nonce(self, address: str, nonce: int):
+        """Our txn with this nonce is stored, so a history that was complete
+        up to it stays complete."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE snapshots SET nonce = nonce + 1 "
+                "WHERE address = ? AND nonce = ?",
+                (address, nonce),
+            )
+
+    def save_states(self, states: dict[str, WalletState]) -> set[str]:
+        """Returns the addresses whose nonce or balances differ from the
+        stored ones. New addresses aren't among them, nothing is known."""
+        with self.lock, self.conn:
+            stored = {
+                row[0]: row[1:]
+                for row in self.conn.execute(
+                    "SELECT address, nonce, eth_balance, weth_balance FROM snapshots"
+                )
+            }
+            self.conn.executemany(
+                "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, 0) "
+                "ON CONFLICT (address) DO UPDATE SET nonce = excluded.nonce, "
+                "eth_balance = excluded.eth_balance, "
+                "weth_balance = excluded.weth_balance, "
+                "changed_at = excluded.changed_at "
+                "WHERE nonce != excluded.nonce "
+                "OR eth_balance != excluded.eth_balance "
+                "OR weth_balance != excluded.weth_balance",
+                [
+                    (
+                        address,
+                        state.nonce,
+                        str(state.eth_balance),
+                        str(state.weth_balance),
+                        time.time(),
+                    )
+                    for address, state in states.items()
+                ],
+            )
+        return {
+            address
+            for address, state in states.items()
+            if address in stored
+            and stored[address]
+            != (state.nonce, str(state.eth_balance), str(state.weth_balance))
+        }
+
+    def mark_synced(self, address: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE snapshots SET synced_at = ? WHERE address = ?",
+                (time.time(), address),
+            )
+
+    def get_synced(self) -> set[str]:
+        """Addresses whose history was synced long enough after their last
+        state change for the explorer to have listed it."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT address FROM snapshots WHERE synced_at >= changed_at + ?",
+                (EXPLORER_LAG,),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def get_synced_nonce(self, address: str) -> int | None:
+        """Nonce up to which the stored history of the address is complete."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT nonce FROM snapshots "
+                "WHERE address = ? AND synced_at >= changed_at + ?",
+                (address, EXPLORER_LAG),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_addresses(self) -> list[str]:
+        """Addresses with stored txns."""
+        with self.lock:
+            rows = self.conn.execute("SELECT DISTINCT address FROM txns").fetchall()
+        return [row[0] for row in rows]
+
+    def get_txns(self, address: str) -> TxnFrame:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT time_stamp, gas_used * gas_price, value FROM txns "
+                "WHERE address = ? ORDER BY block_number",
+                (address,),
+            ).fetchall()
+        timestamps, fees, values = zip(*rows) if rows else ([], [], [])
+        return TxnFrame.from_columns(timestamps, fees, [int(v) for v in values])
+
+
+@cache
+def get_txns_store() -> TxnsStore:
+    return TxnsStore()
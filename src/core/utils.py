@@ -1,15 +1,34 @@
-import random, time, requests
+import random, threading
 from loguru import logger
 from tqdm import tqdm
 
+from config import PRICE_API_URL
+from settings import PRICE_CACHE_TTL, STALE_CACHE_TTL
+from .http_client import get_http_client
+from .ratelimit import backoff
+
+stop_event = threading.Event()
+
 
 def sleep(min: int, max: int):
     sleep_time = random.randint(min, max)
     logger.info(f"Sleeping for {sleep_time:.0f} seconds...")
-    for _ in tqdm(range(sleep_time), leave=False):
-        time.sleep(1)
+    in_main_thread = threading.current_thread() is threading.main_thread()
+    for _ in tqdm(range(sleep_time), leave=False, disable=not in_main_thread):
+        if stop_event.wait(1):
+            raise KeyboardInterrupt
+
+
+def sleep_backoff(attempt: int):
+    if stop_event.wait(backoff(attempt)):
+        raise KeyboardInterrupt
 
 
 def get_eth_price():
-    r = requests.get("https://api.binance.com/api/v3/ticker/price?symbol=ETHUSDT")
-    return float(r.json()["price"])
+    data = get_http_client().get(
+        PRICE_API_URL,
+        params={"symbol": "ETHUSDT"},
+        ttl=PRICE_CACHE_TTL,
+        stale=STALE_CACHE_TTL,
+    )
+    return float(data["price"])
@@ -1,76 +1,248 @@
-import time, random
+import time, threading, hashlib, json, os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable
 from loguru import logger
 
-from web3 import Web3
-from web3.exceptions import TransactionNotFound
-from eth_account import Account as EthereumAccount
+from config import ADDRESS_INDEX_PATH
+from settings import EXPLORER, MAX_INFLIGHT_TXNS
+from .rpc import get_w3, get_chain_id
+from .confirmations import get_confirmer
+from .state import WalletState, get_states
+from .nonce import NonceManager
+from .metrics import timer
+from .signer import sign
+from .journal import get_journal
+from .fees import get_fee_oracle, get_max_price, bump
+from .utils import stop_event
 
-from config import WETH_CONTRACT_ABI, WETH_CONTRACT_ADDRESS
-from settings import EXPLORER, RPC, GAS_MULTIPLIER
+txn_slots = threading.BoundedSemaphore(MAX_INFLIGHT_TXNS)
+slots_lock = threading.Lock()  # a batch takes all its slots at once
+
+
+def wait_for(acquire: Callable[..., bool]):
+    """Blocks on `acquire` in short slices, until Ctrl+C sets stop_event."""
+    while not acquire(timeout=1):
+        if stop_event.is_set():
+            raise KeyboardInterrupt
+
+
+@contextmanager
+def hold_slots(count: int):
+    """One MAX_INFLIGHT_TXNS slot per txn. Taking them one by one under
+    the lock, no two batches can each hold part and wait for the rest."""
+    taken = 0
+    try:
+        wait_for(slots_lock.acquire)
+        try:
+            for _ in range(count):
+                wait_for(txn_slots.acquire)
+                taken += 1
+        finally:
+            slots_lock.release()
+        yield
+    finally:
+        for _ in range(taken):
+            txn_slots.release()
+
+
+@dataclass
+class TxnResult:
+    hash: str
+    receipt: dict
+    nonce: int
+    gas_used: int
+    effective_gas_price: int
+    fee: int  # in wei
+    block_number: int
+    sent_at: float
+    confirmed_at: float
+
+    @property
+    def fee_eth(self) -> float:
+        return self.fee / 10**18
+
+    @property
+    def duration(self) -> float:
+        return self.confirmed_at - self.sent_at
+
+    @classmethod
+    def from_receipt(cls, receipt: dict, txn: dict, sent_at: float) -> "TxnResult":
+        gas_used = int(receipt["gasUsed"], 16)
+        gas_price = int(receipt.get("effectiveGasPrice") or hex(get_max_price(txn)), 16)
+        return cls(
+            hash=receipt["transactionHash"],
+            receipt=receipt,
+            nonce=txn["nonce"],
+            gas_used=gas_used,
+            effective_gas_price=gas_price,
+            fee=gas_used * gas_price,
+            block_number=int(receipt["blockNumber"], 16),
+            sent_at=sent_at,
+            confirmed_at=time.time(),
+        )
+
+
+def derive_address(private_key: str) -> str:
+    from eth_account import Account as EthereumAccount  # heavy, see get_w3
+
+    return EthereumAccount.from_key(private_key).address
+
+
+def load_wallets(keys: list[str]) -> list["Wallet"]:
+    """Addresses come from an on-disk index keyed by the key's sha256, so
+    only keys added since the last start go through key derivation."""
+    index = {}
+    if os.path.exists(ADDRESS_INDEX_PATH):
+        with open(ADDRESS_INDEX_PATH, "r") as file:
+            index = json.load(file)
+
+    wallets, index_size = [], len(index)
+    for i, key in enumerate(keys, 1):
+        key_hash = hashlib.sha256(key.encode()).hexdigest()
+        if key_hash not in index:
+            index[key_hash] = derive_address(key)
+        wallets.append(Wallet(i, key, index[key_hash]))
+
+    if len(index) != index_size:
+        with open(ADDRESS_INDEX_PATH, "w") as file:
+            json.dump(index, file)
+    return wallets
+
+
+def select_wallets(wallets: list["Wallet"], choice: str) -> list["Wallet"]:
+    """Choice as typed in the wallet selection: "all" (or empty), "1",
+    "1,2,3" or "1-3"."""
+    if choice in ["all", ""]:
+        return wallets
+    try:
+        if "," in choice:
+            return [wallets[int(i) - 1] for i in choice.split(",")]
+        elif "-" in choice:
+            first_digit, second_digit = choice.split("-")
+            return wallets[int(first_digit) - 1 : int(second_digit)]
+        else:
+            return [wallets[int(choice) - 1]]
+    except ValueError:
+        raise ValueError("Invalid wallet selection!")
 
 
 class Wallet:
-    def __init__(self, index: int, private_key: str):
+    def __init__(self, index: int, private_key: str, address: str | None = None):
         self.index = index
         self.private_key = private_key
-        self.account = EthereumAccount.from_key(private_key)
-        self.w3 = Web3(Web3.HTTPProvider(RPC))
-        self.weth_contract = self.w3.eth.contract(
-            address=WETH_CONTRACT_ADDRESS, abi=WETH_CONTRACT_ABI
-        )
-        self.address = self.w3.to_checksum_address(self.account.address)
+        self.address = address or derive_address(private_key)
         self.info = f"[№{self.index} - {self.address[:5]}...{self.address[-5:]}]"
 
     @property
-    def eth_balance(self) -> int:
-        return self.w3.eth.get_balance(self.address)
+    def w3(self):
+        return get_w3()
 
-    @property
-    def weth_balance(self) -> float:
-        balance = self.weth_contract.functions.balanceOf(self.address).call()
-        return balance / 10**18
-
-    @property
-    def txn_count(self) -> int:
-        return self.w3.eth.get_transaction_count(self.address)
+    @cached_property
+    def nonces(self) -> NonceManager:
+        return NonceManager(self.w3, self.address)
 
-    def get_txn_cost(self, txn_hash: str) -> float:
-        txn = self.w3.eth.get_transaction(txn_hash)
-        return (txn["gas"] * txn["gasPrice"]) / 10**18
+    def get_state(self) -> WalletState:
+        return get_states([self.address])[self.address]
 
     def get_txn_data(self, value: int = 0) -> dict:
         return {
             "from": self.address,
             "value": value,
-            "nonce": self.w3.eth.get_transaction_count(self.address),
-            "gasPrice": int(self.w3.eth.gas_price * random.uniform(*GAS_MULTIPLIER)),
-            "chainId": self.w3.eth.chain_id,
+            **get_fee_oracle().get_fees(),
+            "chainId": get_chain_id(),
         }
 
-    def send_txn(self, txn: dict):
-        txn["gas"] = self.w3.eth.estimate_gas(txn)
-        signed_txn = self.w3.eth.account.sign_transaction(txn, self.private_key)
-        txn_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        return self.wait_txn(txn_hash.hex())
+    def broadcast(self, txn: dict, raw: bytes | None = None) -> str:
+        raw = raw or sign([txn], self.private_key)[0]
+        return self.w3.eth.send_raw_transaction(raw).to_0x_hex()
+
+    def send_txn(self, txn: dict, kind: str = ""):
+        return self.send_txns([txn], kind)[0]
 
-    def wait_txn(self, hash: str) -> str | None:
-        start_time = time.time()
-        while True:
+    def send_txns(self, txns: list[dict], kind: str = "") -> list[TxnResult | None]:
+        """Sends transactions back-to-back with consecutive local nonces and
+        confirms them together. Unsent transactions are returned as None,
+        as are the ones above MAX_INFLIGHT_TXNS."""
+        hashes, sent_at = {}, {}
+        count = min(len(txns), MAX_INFLIGHT_TXNS)
+        with hold_slots(count):
             try:
-                receipts: dict = self.w3.eth.get_transaction_receipt(hash)
-                status = receipts.get("status")
-                if status == 1:
+                for txn, nonce in zip(txns, self.nonces.reserve(count)):
+                    txn["nonce"] = nonce
+                    if "gas" not in txn:
+                        txn["gas"] = self.w3.eth.estimate_gas(txn)
+                raws = sign(txns[:count], self.private_key)
+            except Exception:
+                self.nonces.reset()
+                raise
+            for txn, raw in zip(txns, raws):
+                try:
+                    hash = self.broadcast(txn, raw)
+                    hashes[hash], sent_at[hash] = txn, time.time()
+                    get_journal().sent(self.address, txn, hash, kind)
+                except Exception as e:
+                    self.nonces.reset()
+                    if not hashes:
+                        raise
+                    logger.error(
+                        f"{self.info} Failed to send txn with nonce {txn['nonce']}!"
+                    )
+                    logger.debug(e)
+                    break
+            results = self.wait_txns(hashes, sent_at)
+        return results + [None] * (len(txns) - len(results))
+
+    def replace_txn(self, txn: dict) -> str | None:
+        bump(txn)
+        logger.warning(
+            f"{self.info} Transaction with nonce {txn['nonce']} is stuck, "
+            f"replacing it..."
+        )
+        try:
+            hash = self.broadcast(txn)
+            get_journal().sent(self.address, txn, hash)
+            return hash
+        except Exception as e:
+            return logger.debug(e)
+
+    def wait_txns(
+        self, txns: dict[str, dict], sent_at: dict[str, float]
+    ) -> list[TxnResult | None]:
+        """Waits for all hashes through the shared confirmer. A hash not mined
+        within 300s while its nonce is still free gets replaced once with a
+        higher gas price, then whichever of the two is mined counts."""
+        results = {hash: None for hash in txns}
+        pending = {hash: [hash] for hash in txns}  # original -> all sent hashes
+        for replaced in (False, True):
+            with timer("txn", "wait_receipts"):
+                receipts = get_confirmer().wait(list(pending.values()), timeout=300)
+            for original, hashes in list(pending.items()):
+                hash = next((hash for hash in hashes if hash in receipts), None)
+                if hash is None:
+                    continue
+                del pending[original]
+                receipt = receipts[hash]
+                get_journal().mined(self.address, txns[original]["nonce"], receipt)
+                if int(receipt["status"], 16) == 1:
                     logger.success(
-                        f"{self.info} Transaction successful! {EXPLORER+'0x'+hash}"
+                        f"{self.info} Transaction successful! {EXPLORER+hash}"
                     )
-                    return hash
-                elif status is None:
-                    time.sleep(0.5)
-                else:
-                    return logger.error(
-                        f"{self.info} Transaction failed! {EXPLORER+'0x'+hash}"
+                    results[original] = TxnResult.from_receipt(
+                        receipt, txns[original], sent_at[original]
                     )
-            except TransactionNotFound:
-                if time.time() - start_time > 300:
-                    return
-                time.sleep(1)
+                else:
+                    logger.error(f"{self.info} Transaction failed! {EXPLORER+hash}")
+            if not pending or replaced:
+                break
+
+            mined_nonce = self.w3.eth.get_transaction_count(self.address)
+            for original, hashes in pending.items():
+                if txns[original]["nonce"] >= mined_nonce:
+                    if hash := self.replace_txn(txns[original]):
+                        hashes.append(hash)
+
+        if pending:
+            self.nonces.reset()
+        return list(results.values())
@@ -1,41 +1,72 @@
 import random
+from dataclasses import dataclass
 from loguru import logger
 
 from web3.contract import Contract
 
 from .checker import Checker
-from .utils import sleep
-from .wallet import Wallet
-from config import WETH_CONTRACT_ADDRESS, WETH_CONTRACT_ABI
-from settings import RETRY_COUNT, SLEEP_BETWEEN_TXNS
+from .utils import sleep, sleep_backoff
+from .wallet import Wallet, TxnResult
+from .planner import GasPlanner
+from .templates import build_txn, invalidate
+from .rpc import get_contract
+from config import WETH_CONTRACT_ADDRESS
+from settings import RETRY_COUNT, SLEEP_BETWEEN_TXNS, GAS_PLANNER, WRAP_RESYNC_EVERY
+
+DEPOSIT_TOPIC = "0xe1fffcc4923d04b559f4d29a8bfc6cda04eb5b0d3c460751c2402c5c5cc9109c"
+WITHDRAWAL_TOPIC = "0x7fcf532c15f0a6db0bd6d0e038bea71d30d808c7d98cb3bf7268a95bf5081b65"
+
+
+@dataclass
+class Balances:
+    """Local ETH and WETH balances of a wallet, in wei."""
+
+    eth: int
+    weth: int
+
+    def apply(self, result: TxnResult) -> bool:
+        """Applies the txn's fee and WETH Deposit/Withdrawal events. Returns
+        False if the receipt has no such event, the balances may be off then."""
+        self.eth -= result.fee
+        events = 0
+        for log in result.receipt.get("logs", []):
+            if log["address"].lower() != WETH_CONTRACT_ADDRESS.lower():
+                continue
+            topic, amount = log["topics"][0], int(log["data"], 16)
+            if topic == DEPOSIT_TOPIC:
+                self.eth, self.weth = self.eth - amount, self.weth + amount
+            elif topic == WITHDRAWAL_TOPIC:
+                self.eth, self.weth = self.eth + amount, self.weth - amount
+            else:
+                continue
+            events += 1
+        return events > 0
 
 
 class Wrap:
     def __init__(self, wallet: Wallet) -> None:
         self.wallet = wallet
-        self.contract: Contract = self.wallet.w3.eth.contract(
-            address=WETH_CONTRACT_ADDRESS, abi=WETH_CONTRACT_ABI
-        )
+        self.contract: Contract = get_contract(WETH_CONTRACT_ADDRESS)
+        self.planner = GasPlanner(wallet) if GAS_PLANNER else None
         self.traded_volume = 0
+        self.gas_spent_pts = 0
+        self.balances: Balances | None = None
 
     def wrap_eth(self, amount: int):
         logger.info(f"{self.wallet.info} Making deposit of {amount/10**18:.3f} ETH...")
-        txn = self.contract.functions.deposit().build_transaction(
-            self.wallet.get_txn_data(amount)
-        )
-        return self.wallet.send_txn(txn)
+        txn = build_txn(self.wallet, self.contract, "deposit", value=amount)
+        if self.planner:
+            self.planner.plan(txn, "deposit", 73000 - self.gas_spent_pts)
+        return self.wallet.send_txn(txn, "deposit")
 
-    def unwrap_eth(self):
-        amount = self.wallet.weth_contract.functions.balanceOf(
-            self.wallet.address
-        ).call()
+    def unwrap_eth(self, amount: int):
         logger.info(
             f"{self.wallet.info} Making withdrawal of {amount/10**18:.3f} ETH..."
         )
-        txn = self.contract.functions.withdraw(amount).build_transaction(
-            self.wallet.get_txn_data()
-        )
-        return self.wallet.send_txn(txn)
+        txn = build_txn(self.wallet, self.contract, "withdraw", (amount,))
+        if self.planner:
+            self.planner.plan(txn, "withdraw", 73000 - self.gas_spent_pts)
+        return self.wallet.send_txn(txn, "withdraw")
 
     def try_deposit(self, amount: int):
         for attempt in range(1, RETRY_COUNT + 1):
@@ -48,12 +79,16 @@ class Wrap:
             except Exception as e:
                 logger.error(f"{self.wallet.info} Deposit attempt {attempt} failed!")
                 logger.debug(e)
+                invalidate(self.wallet, self.contract, "deposit")
+                if attempt < RETRY_COUNT:
+                    sleep_backoff(attempt)
+                    self.sync_balances()  # the failed txn may still have landed
         logger.critical(f"{self.wallet.info} All deposit attempts failed!")
 
     def try_withdraw(self):
         for attempt in range(1, RETRY_COUNT + 1):
             try:
-                result = self.unwrap_eth()
+                result = self.unwrap_eth(self.balances.weth)
                 if result not in (None, False):
                     return result
                 else:
@@ -61,13 +96,40 @@ class Wrap:
             except Exception as e:
                 logger.error(f"{self.wallet.info} Withdraw attempt {attempt} failed!")
                 logger.debug(e)
+                invalidate(self.wallet, self.contract, "withdraw")
+                if attempt < RETRY_COUNT:
+                    sleep_backoff(attempt)
+                    self.sync_balances()  # the failed txn may still have landed
         logger.critical(f"{self.wallet.info} All withdraw attempts failed!")
 
+    def sync_balances(self):
+        state = self.wallet.get_state()
+        self.balances = Balances(state.eth_balance, state.weth_balance)
+
+    def add_gas_spent(self, kind: str, result: TxnResult):
+        self.gas_spent_pts += Checker.get_txn_gas_spent_pts(result.fee_eth)
+        if self.planner:
+            self.planner.record(kind, result)
+        if not self.balances.apply(result):
+            logger.debug(f"{self.wallet.info} No WETH event in receipt, resyncing")
+            self.sync_balances()
+
+    def log_plan(self, volume_pts: float):
+        cycle_volume_pts = Checker.get_txn_volume_pts(
+            (self.balances.eth + self.balances.weth) / 10**18
+        )
+        cycles = min(
+            GasPlanner.get_txns_count(73000 - self.gas_spent_pts, 2000),
+            GasPlanner.get_txns_count(73000 - volume_pts, cycle_volume_pts or 1),
+        )
+        self.planner.log_plan(cycles * 2)
+
     def run(self):
-        txns = Checker.filter_today_txns(Checker.get_txns(self.wallet))
+        state = self.wallet.get_state()
+        txns = Checker.filter_today_txns(Checker.get_txns(self.wallet, state.nonce))
 
-        gas_spent_pts = Checker.get_gas_spent_pts(txns)
-        if gas_spent_pts >= 73000:
+        self.gas_spent_pts = Checker.get_gas_spent_pts(txns)
+        if self.gas_spent_pts >= 73000:
             return logger.warning(
                 f"{self.wallet.info} Wallet already have 73k gas spent points!"
             )
@@ -76,17 +138,22 @@ class Wrap:
             return logger.warning(
                 f"{self.wallet.info} Wallet already have 73k volume points!"
             )
+        self.balances = Balances(state.eth_balance, state.weth_balance)
+        if self.planner:
+            self.log_plan(volume_pts)
 
+        cycles = 0
         while True:
+            if cycles and cycles % WRAP_RESYNC_EVERY == 0:
+                self.sync_balances()
+            cycles += 1
             keep_amount = int(random.uniform(0.0001, 0.0003) * 10**18)
-            deposit_amount = self.wallet.eth_balance - keep_amount
+            deposit_amount = self.balances.eth - keep_amount
             if deposit_amount < (0.01 * 10**18):
-                if self.wallet.weth_balance > 0:
+                if self.balances.weth > 0:
                     withdraw_success = self.try_withdraw()
                     if withdraw_success:
-                        gas_spent_pts += Checker.get_txn_gas_spent_pts(
-                            self.wallet.get_txn_cost(withdraw_success)
-                        )
+                        self.add_gas_spent("withdraw", withdraw_success)
                         sleep(*SLEEP_BETWEEN_TXNS)
                         continue
                 logger.error(f"{self.wallet.info} Deposit amount < 0.01ETH!")
@@ -94,9 +161,7 @@ class Wrap:
 
             deposit_success = self.try_deposit(deposit_amount)
             if deposit_success:
-                gas_spent_pts += Checker.get_txn_gas_spent_pts(
-                    self.wallet.get_txn_cost(deposit_success)
-                )
+                self.add_gas_spent("deposit", deposit_success)
             else:
                 break
 
@@ -104,9 +169,7 @@ class Wrap:
 
             withdraw_success = self.try_withdraw()
             if withdraw_success:
-                gas_spent_pts += Checker.get_txn_gas_spent_pts(
-                    self.wallet.get_txn_cost(withdraw_success)
-                )
+                self.add_gas_spent("withdraw", withdraw_success)
             else:
                 break
 
@@ -117,10 +180,10 @@ class Wrap:
             )
             logger.debug(
                 f"{self.wallet.info} Traded volume: {self.traded_volume:.2f}ETH | "
-                + f"Gas progress: {gas_spent_pts/73000*100:.1f}% | "
+                + f"Gas progress: {self.gas_spent_pts/73000*100:.1f}% | "
                 + f"Volume progress: {volume_pts/73000*100:.1f}%"
             )
 
-            if gas_spent_pts >= 73000 or volume_pts >= 73000:
+            if self.gas_spent_pts >= 73000 or volume_pts >= 73000:
                 break
             sleep(*SLEEP_BETWEEN_TXNS)
@@ -0,0 +1,127 @@
+"""Headless mode: runs DAEMON_JOBS every day shortly after the UTC reset
+of daily points, without the interactive menu.
+
+    python daemon.py
+
+Wallets, RPC connections, caches and the signer pool stay warm between
+days. What the daemon is doing is written to DAEMON_STATUS_PATH.
+"""
+
+import datetime, json, os, random, signal, sys
+from loguru import logger
+
+import core
+from config import load_keys, DAEMON_STATUS_PATH
+from settings import DAEMON_JOBS, DAEMON_START_DELAY, CHECKER_ASYNC
+from core.utils import stop_event
+
+JOBS = ("Wrap", "Rubyscore", "Checker")
+
+
+def utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def format_time(moment: datetime.datetime) -> str:
+    return moment.isoformat(timespec="seconds")
+
+
+def get_next_reset(now: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime.combine(
+        now.date() + datetime.timedelta(days=1),
+        datetime.time.min,
+        tzinfo=datetime.timezone.utc,
+    )
+
+
+class Daemon:
+    def __init__(self, wallets: list["core.Wallet"]):
+        self.wallets = wallets
+        self.status = self.load_status()
+        self.status.update(pid=os.getpid(), started_at=format_time(utc_now()))
+
+    @staticmethod
+    def load_status() -> dict:
+        if not os.path.exists(DAEMON_STATUS_PATH):
+            return {}
+        with open(DAEMON_STATUS_PATH, "r") as file:
+            try:
+                return json.load(file)
+            except ValueError:
+                return {}
+
+    def save_status(self, **changes):
+        self.status.update(changes, updated_at=format_time(utc_now()))
+        with open(DAEMON_STATUS_PATH + ".tmp", "w") as file:
+            json.dump(self.status, file, indent=2)
+        os.replace(DAEMON_STATUS_PATH + ".tmp", DAEMON_STATUS_PATH)
+
+    def run_job(self, job: str, choice: str):
+        wallets = core.select_wallets(self.wallets, choice)
+        run = {
+            "job": job,
+            "wallets": len(wallets),
+            "started_at": format_time(utc_now()),
+        }
+        self.status["runs"].append(run)
+        self.save_status(state="running", job=job)
+        logger.info(f"Daemon: running {job} on {len(wallets)} wallets")
+        try:
+            if job == "Checker":
+                (core.AsyncChecker if CHECKER_ASYNC else core.Checker)(wallets).run()
+            else:
+                core.Scheduler(getattr(core, job), wallets).run()
+        except Exception as e:
+            logger.critical(f"Daemon: {job} failed! {e}")
+            run["error"] = str(e)
+        run["finished_at"] = format_time(utc_now())
+        self.save_status(job=None)
+
+    def run_day(self, day: datetime.date):
+        self.save_status(day=day.isoformat(), runs=[])
+        for job, choice in DAEMON_JOBS:
+            self.run_job(job, choice)
+        self.save_status(state="idle", done_day=day.isoformat())
+
+    def wait_until(self, moment: datetime.datetime):
+        self.save_status(state="waiting", next_run=format_time(moment))
+        logger.info(f"Daemon: next run at {moment:%Y-%m-%d %H:%M:%S} UTC")
+        # short waits, the clock may jump after the machine sleeps
+        while (left := (moment - utc_now()).total_seconds()) > 0:
+            if stop_event.wait(min(left, 60)):
+                raise KeyboardInterrupt
+
+    def run(self):
+        while True:
+            now = utc_now()
+            if self.status.get("done_day") != now.date().isoformat():
+                self.run_day(now.date())  # today's jobs are due, or were missed
+                continue
+            delay = random.randint(*DAEMON_START_DELAY)
+            self.wait_until(get_next_reset(now) + datetime.timedelta(seconds=delay))
+
+
+def stop(*args):
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    for job, _ in DAEMON_JOBS:
+        if job not in JOBS:
+            logger.critical(f"Unknown daemon job {job}, expected one of {JOBS}")
+            sys.exit(1)
+    wallets = core.load_wallets(load_keys())
+    if len(wallets) == 0:
+        logger.critical(
+            f"Fill in the wallet list! 👉 {os.path.join(os.getcwd(), 'data/keys.txt')}"
+        )
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)  # e.g. systemctl stop, docker stop
+    daemon = Daemon(wallets)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        stop_event.set()
+        daemon.save_status(state="stopped", job=None)
+        print("\n👋👋👋")
@@ -1,13 +1,19 @@
 import sys, questionary, os
 from loguru import logger
 
-from core import *
+import core
 from config import *
 from settings import *
 
 
+def run_checker(wallets: list["core.Wallet"]):
+    checker = core.AsyncChecker if CHECKER_ASYNC else core.Checker
+    return checker(wallets).run()
+
+
 def wallet_selector():
-    Checker(WALLETS).run()
+    if CHECK_ON_START:
+        run_checker(WALLETS)
     if len(WALLETS) == 1:
         return WALLETS
     print(
@@ -17,19 +23,7 @@ def wallet_selector():
         "1-3 — to select wallets from the first to the third inclusive\n"
         "all — to select all wallets (or press Enter)\n"
     )
-    result = input("Enter your choice: ")
-    if result in ["all", ""]:
-        return WALLETS
-    try:
-        if "," in result:
-            return [WALLETS[int(i) - 1] for i in result.split(",")]
-        elif "-" in result:
-            first_digit, second_digit = result.split("-")
-            return WALLETS[int(first_digit) - 1 : int(second_digit)]
-        else:
-            return [WALLETS[int(result) - 1]]
-    except ValueError:
-        raise ValueError("Invalid wallet selection!")
+    return core.select_wallets(WALLETS, input("Enter your choice: "))
 
 
 def main():
@@ -37,8 +31,8 @@ def main():
         message="Select module: ",
         instruction="(use the arrows to navigate)",
         choices=[
-            questionary.Choice("💼 Wrap-Unwrap", Wrap),
-            questionary.Choice("💻 Rubyscore", Rubyscore),
+            questionary.Choice("💼 Wrap-Unwrap", "Wrap"),
+            questionary.Choice("💻 Rubyscore", "Rubyscore"),
             questionary.Choice("📊 Checker", "checker"),
             questionary.Choice("🔙 Go back to wallet selection", "back"),
             questionary.Choice("❌ Exit", "exit"),
@@ -48,17 +42,13 @@ def main():
     ).ask()
 
     if module == "checker":
-        return Checker(wallets).run()
+        return run_checker(wallets)
     elif module == "back":
         return True
     elif module in ["exit", None]:
         sys.exit(0)
 
-    for wallet in wallets:
-        module(wallet).run()
-        logger.success(f"{wallet.info} Wallet completed 🏁")
-        if wallet != wallets[-1]:
-            sleep(*SLEEP_BETWEEN_WALLETS)
+    core.Scheduler(getattr(core, module), wallets).run()
 
 
 if __name__ == "__main__":
@@ -66,7 +56,7 @@ if __name__ == "__main__":
     sys.stdout.write("\033[2J\033[H")  # clear console
     sys.stdout.flush()
 
-    WALLETS = [Wallet(i, key) for i, key in enumerate(KEYS, 1)]
+    WALLETS = core.load_wallets(load_keys())
     if len(WALLETS) == 0:
         logger.critical(
             f"Fill in the wallet list! 👉 {os.path.join(os.getcwd(), 'data/keys.txt')}"
@@ -0,0 +1,345 @@
+import json, threading, time, rlp
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from eth_account import Account
+from eth_utils import keccak
+
+from config import GAS_SPENT_COEF, WETH_CONTRACT_ADDRESS
+
+CHAIN_ID = 167000
+BASE_FEE = 100_000_000
+PRIORITY_FEE = 20_000_000
+GAS_PRICE = BASE_FEE + PRIORITY_FEE  # 0.12 gwei, txns earn the 1000 gas points cap
+GAS_ESTIMATE = 50_000
+GAS_USED = 45_000
+BALANCE = 10**18  # of every new address, in wei
+CAP_FEE = int(GAS_SPENT_COEF * 1000 * 10**18)  # fee of a 1000 gas points txn
+CAP_VALUE = 25 * 10**16  # value of a 1000 volume points txn
+
+BALANCE_OF = "0x70a08231"
+DEPOSIT = "0xd0e30db0"
+WITHDRAW = "0x2e1a7d4d"
+DEPOSIT_TOPIC = "0x" + keccak(text="Deposit(address,uint256)").hex()
+WITHDRAWAL_TOPIC = "0x" + keccak(text="Withdrawal(address,uint256)").hex()
+FUNCTION_NAMES = {
+    DEPOSIT: "deposit()",
+    WITHDRAW: "withdraw(uint256 wad)",
+    "0x" + keccak(text="vote()")[:4].hex(): "vote()",
+}
+
+
+class RpcError(Exception):
+    pass
+
+
+def decode_raw_txn(raw: bytes) -> dict:
+    if raw[0] > 0x7F:  # legacy
+        nonce, gas_price, gas, to, value, data, *_ = rlp.decode(raw)
+    elif raw[0] == 2:  # EIP-1559, charged at the effective gas price
+        _, nonce, priority_fee, max_fee, gas, to, value, data, *_ = rlp.decode(raw[1:])
+        priority_fee = int.from_bytes(priority_fee, "big")
+        max_fee = int.from_bytes(max_fee, "big")
+        gas_price = min(max_fee, BASE_FEE + priority_fee).to_bytes(32, "big")
+    else:
+        raise RpcError(f"unsupported transaction type {raw[0]}")
+    return {
+        "from": Account.recover_transaction(raw),
+        "nonce": int.from_bytes(nonce, "big"),
+        "gasPrice": int.from_bytes(gas_price, "big"),
+        "gas": int.from_bytes(gas, "big"),
+        "to": "0x" + to.hex(),
+        "value": int.from_bytes(value, "big"),
+        "input": "0x" + data.hex(),
+    }
+
+
+class MockAccount:
+    def __init__(self, address: str, history_pts: float):
+        self.eth = BALANCE
+        self.weth = 0
+        self.nonce = 0
+        self.txns: list[dict] = []
+        self.history_pts = history_pts  # seeded on the first explorer query
+
+
+class MockChain:
+    """Just enough of an EVM chain for Wrap and Rubyscore: balances, WETH,
+    nonces, and receipts that show up `confirm_delay` seconds after sending.
+    Sent txns are also listed by the mock explorer."""
+
+    def __init__(self, confirm_delay: float = 0, history_pts: float = 0):
+        self.confirm_delay = confirm_delay
+        self.history_pts = history_pts
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.accounts: dict[str, MockAccount] = {}
+            self.receipts: dict[str, tuple[float, dict]] = {}
+            self.block = 1_000_000
+            self.block_times: dict[int, int] = {}
+
+    def get_account(self, address: str) -> MockAccount:
+        address = address.lower()
+        if address not in self.accounts:
+            self.accounts[address] = MockAccount(address, self.history_pts)
+        return self.accounts[address]
+
+    def add_txn(self, account: MockAccount, txn: dict, gas_used: int, hash: str):
+        self.block += 1
+        self.block_times[self.block] = int(time.time())
+        account.txns.append(
+            {
+                "blockNumber": str(self.block),
+                "timeStamp": str(self.block_times[self.block]),
+                "hash": hash,
+                "nonce": str(txn["nonce"]),
+                "blockHash": "0x" + keccak(text=str(self.block)).hex(),
+                "transactionIndex": "0",
+                "from": txn["from"].lower(),
+                "to": txn["to"].lower(),
+                "value": str(txn["value"]),
+                "gas": str(txn["gas"]),
+                "gasPrice": str(txn["gasPrice"]),
+                "isError": "0",
+                "txreceipt_status": "1",
+                "input": txn["input"],
+                "contractAddress": "",
+                "cumulativeGasUsed": str(gas_used),
+                "gasUsed": str(gas_used),
+                "confirmations": "1",
+                "methodId": txn["input"][:10],
+                "functionName": FUNCTION_NAMES.get(txn["input"][:10], ""),
+            }
+        )
+
+    def seed_history(self, address: str, account: MockAccount):
+        """Today's txns worth `history_pts` gas and volume points, so modules
+        only have the rest of the 73k left to do."""
+        for i in range(int(account.history_pts // 1000)):
+            txn = {
+                "nonce": i,
+                "from": address,
+                "to": WETH_CONTRACT_ADDRESS,
+                "value": CAP_VALUE,
+                "gas": GAS_ESTIMATE,
+                "gasPrice": CAP_FEE // GAS_USED + 1,
+                "input": DEPOSIT,
+            }
+            self.add_txn(
+                account, txn, GAS_USED, "0x" + keccak(text=f"{address}{i}").hex()
+            )
+        account.history_pts = 0
+
+    @staticmethod
+    def get_log(topic: str, address: str, amount: int) -> dict:
+        return {
+            "address": WETH_CONTRACT_ADDRESS.lower(),
+            "topics": [topic, "0x" + address[2:].lower().rjust(64, "0")],
+            "data": "0x" + hex(amount)[2:].rjust(64, "0"),
+        }
+
+    def send_raw_txn(self, raw: str) -> str:
+        raw = bytes.fromhex(raw[2:])
+        txn = decode_raw_txn(raw)
+        hash = "0x" + keccak(raw).hex()
+        fee = GAS_USED * txn["gasPrice"]
+        selector, args = txn["input"][:10], txn["input"][10:]
+        with self.lock:
+            account = self.get_account(txn["from"])
+            if txn["nonce"] != account.nonce:
+                raise RpcError(f"nonce too low: next nonce {account.nonce}")
+            if account.eth < txn["value"] + txn["gas"] * txn["gasPrice"]:
+                raise RpcError("insufficient funds for gas * price + value")
+            if selector == WITHDRAW and int(args[:64], 16) > account.weth:
+                raise RpcError("execution reverted")
+            account.nonce += 1
+            account.eth -= txn["value"] + fee
+            logs = []
+            if txn["to"] == WETH_CONTRACT_ADDRESS.lower() and selector == DEPOSIT:
+                account.weth += txn["value"]
+                logs.append(self.get_log(DEPOSIT_TOPIC, txn["from"], txn["value"]))
+            elif txn["to"] == WETH_CONTRACT_ADDRESS.lower() and selector == WITHDRAW:
+                account.weth -= int(args[:64], 16)
+                account.eth += int(args[:64], 16)
+                logs.append(
+                    self.get_log(WITHDRAWAL_TOPIC, txn["from"], int(args[:64], 16))
+                )
+            self.add_txn(account, txn, GAS_USED, hash)
+            receipt = {
+                "transactionHash": hash,
+                "blockNumber": hex(self.block),
+                "from": txn["from"].lower(),
+                "to": txn["to"],
+                "gasUsed": hex(GAS_USED),
+                "cumulativeGasUsed": hex(GAS_USED),
+                "effectiveGasPrice": hex(txn["gasPrice"]),
+                "status": "0x1",
+                "logs": logs,
+            }
+            self.receipts[hash] = (time.time() + self.confirm_delay, receipt)
+        return hash
+
+    def get_receipt(self, hash: str) -> dict | None:
+        ready_at, receipt = self.receipts.get(hash, (0, None))
+        return receipt if time.time() >= ready_at else None
+
+    def call(self, method: str, params: list):
+        if method == "eth_chainId":
+            return hex(CHAIN_ID)
+        if method == "eth_blockNumber":
+            return hex(self.block)
+        if method == "eth_gasPrice":
+            return hex(GAS_PRICE)
+        if method == "eth_feeHistory":
+            blocks, percentiles = int(params[0], 16), params[2]
+            return {
+                "oldestBlock": hex(self.block - blocks + 1),
+                "baseFeePerGas": [hex(BASE_FEE)] * (blocks + 1),
+                "gasUsedRatio": [0.5] * blocks,
+                "reward": [[hex(PRIORITY_FEE)] * len(percentiles)] * blocks,
+            }
+        if method == "eth_estimateGas":
+            return hex(GAS_ESTIMATE)
+        if method == "eth_getBalance":
+            with self.lock:
+                return hex(self.get_account(params[0]).eth)
+        if method == "eth_getTransactionCount":
+            with self.lock:
+                return hex(self.get_account(params[0]).nonce)
+        if method == "eth_call":
+            data = params[0].get("data") or params[0].get("input", "")
+            if data.startswith(BALANCE_OF):
+                with self.lock:
+                    balance = self.get_account("0x" + data[-40:]).weth
+                return "0x" + hex(balance)[2:].rjust(64, "0")
+            return "0x"
+        if method == "eth_sendRawTransaction":
+            return self.send_raw_txn(params[0])
+        if method == "eth_getTransactionReceipt":
+            return self.get_receipt(params[0])
+        if method == "eth_getBlockByNumber":
+            number = int(params[0], 16)
+            with self.lock:
+                timestamp = self.block_times.get(number, int(time.time()))
+            return {
+                "number": params[0],
+                "timestamp": hex(timestamp),
+                "transactions": [],
+            }
+        raise RpcError(f"the method {method} does not exist/is not available")
+
+    def get_txlist(self, params: dict) -> dict:
+        address = params["address"].lower()
+        with self.lock:
+            account = self.get_account(address)
+            if account.history_pts:
+                self.seed_history(address, account)
+            start_block = int(params.get("startblock", 0))
+            txns = [t for t in account.txns if int(t["blockNumber"]) >= start_block]
+        page, offset = int(params.get("page", 1)), int(params.get("offset", 10000))
+        txns = txns[(page - 1) * offset : page * offset]
+        if not txns:
+            return {"status": "0", "message": "No transactions found", "result": []}
+        return {"status": "1", "message": "OK", "result": txns}
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the checker opens dozens of connections at once
+
+
+class MockNode:
+    """Local stand-ins for the RPC node, taikoscan, Trailblazer and Binance,
+    each on its own port so per-host rate limits apply as in production.
+
+    Every HTTP request waits `latency` seconds before it is answered and is
+    counted by service, JSON-RPC calls are also counted by method.
+    """
+
+    SERVICES = ("rpc", "explorer", "trailblazer", "price")
+
+    def __init__(self, latency: float = 0, confirm_delay: float = 0, history_pts=0):
+        self.latency = latency
+        self.chain = MockChain(confirm_delay, history_pts)
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.servers = {}
+        for service in self.SERVICES:
+            handler = self.make_handler(service)
+            self.servers[service] = MockServer(("127.0.0.1", 0), handler)
+
+    def url(self, service: str) -> str:
+        return f"http://127.0.0.1:{self.servers[service].server_port}"
+
+    def count(self, *keys: str):
+        with self.lock:
+            self.counts.update(keys)
+
+    def reset(self):
+        self.chain.reset()
+        with self.lock:
+            self.counts = Counter()
+
+    def start(self):
+        for server in self.servers.values():
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+
+    def handle_rpc(self, payload: dict | list) -> dict | list:
+        calls = payload if isinstance(payload, list) else [payload]
+        self.count(*[f"rpc:{call['method']}" for call in calls])
+        results = []
+        for call in calls:
+            try:
+                result = {"result": self.chain.call(call["method"], call["params"])}
+            except RpcError as e:
+                result = {"error": {"code": -32000, "message": str(e)}}
+            results.append({"jsonrpc": "2.0", "id": call["id"], **result})
+        return results if isinstance(payload, list) else results[0]
+
+    def handle_get(self, service: str, params: dict) -> dict:
+        if service == "explorer":
+            return self.chain.get_txlist(params)
+        if service == "trailblazer":
+            return {"rank": 20000, "score": 15000.5, "blacklisted": False}
+        return {"symbol": params.get("symbol", "ETHUSDT"), "price": "3000.00"}
+
+    def make_handler(self, service: str) -> type:
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+            def reply(self, data):
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                node.count(service)
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(node.latency)
+                self.reply(node.handle_rpc(json.loads(body)))
+
+            def do_GET(self):
+                node.count(service)
+                query = parse_qs(urlparse(self.path).query)
+                time.sleep(node.latency)
+                self.reply(
+                    node.handle_get(service, {k: v[0] for k, v in query.items()})
+                )
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
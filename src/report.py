@@ -0,0 +1,154 @@
+"""Reports from the checker history in data/history.db, no network calls.
+
+    python report.py                          # fleet totals per day
+    python report.py --wallets all            # trend of every wallet
+    python report.py --from 2024-11-01 --to 2024-11-30 --wallets 1-10
+    python report.py --points                 # points per day, from txns
+
+Days are UTC, each wallet counts with its last check of the day. With
+--points every day with txns in data/txns.db counts, checked or not.
+Wallets are picked like in the wallet selection, or by address.
+"""
+
+import argparse, datetime, time
+import tabulate
+
+from config import load_keys
+from core.history import get_history_store
+from core.points import TxnFrame
+from core.txns_store import get_txns_store
+
+
+def parse_args() -> argparse.Namespace:
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=datetime.date.fromisoformat,
+        default=today - datetime.timedelta(days=30),
+    )
+    parser.add_argument(
+        "--to", dest="end", type=datetime.date.fromisoformat, default=today
+    )
+    parser.add_argument(
+        "--wallets", help="all, 1, 1,2,3, 1-3 or addresses, per wallet trends"
+    )
+    parser.add_argument(
+        "--points",
+        action="store_true",
+        help="gas and volume points per day of the wallets' txn history",
+    )
+    return parser.parse_args()
+
+
+def get_addresses(choice: str) -> dict[str, int | None]:
+    """Address -> its number in data/keys.txt, None if not in there."""
+    if choice.startswith("0x"):
+        return {address.lower(): None for address in choice.split(",")}
+    import core  # derives addresses of new keys, only needed here
+
+    wallets = core.load_wallets(load_keys())
+    return {
+        wallet.address.lower(): wallet.index
+        for wallet in core.select_wallets(wallets, choice)
+    }
+
+
+def format_rank(rank: int | None) -> str:
+    return f"#{rank:,}" if rank else "-"  # 0 — unranked
+
+
+def format_rank_change(first: int, last: int) -> str:
+    return f"{first - last:+,}" if first and last else "-"  # + is up
+
+
+def get_daily_pts(
+    start: datetime.date, end: datetime.date, addresses: list[str] | None = None
+) -> dict[datetime.date, tuple[float, float]]:
+    """Points of every wallet's txns per UTC day, in one pass over all."""
+    store = get_txns_store()
+    stored = store.get_addresses()
+    if addresses is not None:
+        stored = [address for address in stored if address.lower() in addresses]
+    daily_pts = TxnFrame.concat([store.get_txns(a) for a in stored]).daily_pts()
+    return {day: pts for day, pts in daily_pts.items() if start <= day <= end}
+
+
+def format_points(daily_pts: dict[datetime.date, tuple[float, float]]) -> list[dict]:
+    return [
+        {
+            "Day": day.isoformat(),
+            "Gas pts": f"{gas_pts:,.0f}",
+            "Vol pts": f"{volume_pts:,.0f}",
+        }
+        for day, (gas_pts, volume_pts) in sorted(daily_pts.items())
+    ]
+
+
+def format_fleet(rows: list[dict]) -> list[dict]:
+    return [
+        {
+            "Day": row["day"],
+            "Wallets": row["wallets"],
+            "ETH": f"{row['eth']:.5f}",
+            "WETH": f"{row['weth']:.5f}",
+            "Score": f"{row['score']:,.0f}",
+            "Best rank": format_rank(row["best_rank"]),
+            "Gas pts": f"{row['gas_pts']:,.0f}",
+            "Vol pts": f"{row['volume_pts']:,.0f}",
+            "Txns": f"{row['txns']:,}",
+            "Gas ($)": f"{row['gas_usd']:,.2f}",
+            "Ban": f"{row['banned']}/{row['wallets']}",
+        }
+        for row in rows
+    ]
+
+
+def format_trends(rows: list[dict], indexes: dict[str, int | None]) -> list[dict]:
+    return [
+        {
+            "№": indexes.get(row["address"]) or "-",
+            "Address": f"{row['address'][:5]}...{row['address'][-5:]}",
+            "Days": f"{row['days']} ({row['first_day']}..{row['last_day']})",
+            "Score": f"{row['last_score']:,.0f}",
+            "Score Δ": f"{row['last_score'] - row['first_score']:+,.0f}",
+            "Rank": format_rank(row["last_rank"]),
+            "Rank Δ": format_rank_change(row["first_rank"], row["last_rank"]),
+            "LVL": row["level"],
+            "Gas pts": f"{row['gas_pts']:,.0f}",
+            "Vol pts": f"{row['volume_pts']:,.0f}",
+            "Txns": f"{row['txns']:,}",
+            "Gas ($)": f"{row['gas_usd']:,.2f}",
+            "Ban": "✅" if row["banned"] else "❌",
+        }
+        for row in rows
+    ]
+
+
+def main():
+    args = parse_args()
+    store = get_history_store()
+    indexes = get_addresses(args.wallets) if args.wallets else {}
+    addresses = list(indexes) if args.wallets else None
+
+    start = time.perf_counter()
+    if args.points:
+        rows = format_points(get_daily_pts(args.start, args.end, addresses))
+    elif args.wallets:
+        rows = format_trends(
+            store.get_wallet_trends(args.start, args.end, addresses), indexes
+        )
+    else:
+        rows = format_fleet(store.get_fleet_totals(args.start, args.end))
+    elapsed = time.perf_counter() - start
+
+    if not rows:
+        source = "txns" if args.points else "checker results"
+        return print(f"No {source} from {args.start} to {args.end}")
+    print(tabulate.tabulate(rows, headers="keys", tablefmt="rounded_grid"))
+    print(f"{args.start} — {args.end}, queried in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
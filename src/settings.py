@@ -1,7 +1,59 @@
 EXPLORER: str = "https://taikoexplorer.com/tx/"
-RPC: str = "https://rpc.ankr.com/taiko"
+RPC: str | list[str] = [  # one or more endpoints, the fastest healthy one is used
+    "https://rpc.ankr.com/taiko",
+    "https://rpc.mainnet.taiko.xyz",
+]
+RPC_BATCH_SIZE: int = 100  # max calls in one JSON-RPC batch request
+RPC_POOL_SIZE: int = 50  # max keep-alive connections to RPC
+RPC_RATE_LIMIT: float = 20  # max RPC requests per second, per endpoint
+RPC_HEDGE_AFTER: float = (
+    1  # in seconds, slow reads are also sent to the next RPC (0 — off)
+)
+RPC_BROADCAST: int = 2  # RPC endpoints every signed txn is sent to
+RPC_WS: str = ""  # websocket RPC for new block subscriptions, empty — polling
 
-GAS_MULTIPLIER: tuple[float, float] = (1.2, 1.4)
+GAS_MULTIPLIER: tuple[float, float] = (1.2, 1.4)  # of the tip, legacy — of gas price
+EIP1559: bool = True  # type-2 txns priced from recent fee history, False — legacy
+FEE_PERCENTILE: int = 50  # priority fee percentile of recent blocks, higher — faster
+GAS_PLANNER: bool = False  # price each txn to earn the full 1000 gas points
 RETRY_COUNT: int = 3
 SLEEP_BETWEEN_WALLETS: tuple[int, int] = (30, 60)  # in seconds
 SLEEP_BETWEEN_TXNS: tuple[int, int] = (10, 15)  # in seconds
+MAX_CONCURRENT_WALLETS: int = 10  # wallets running at the same time
+MAX_INFLIGHT_TXNS: int = 5  # pending transactions across all wallets
+WRAP_RESYNC_EVERY: int = 10  # wrap cycles between balance checks on chain
+PIPELINE_SIZE: int = 1  # rubyscore votes sent back-to-back per batch (1 — off)
+SIGNER_PROCESSES: int = 2  # processes signing txns in batches (0 — in wallet threads)
+
+HTTP_TIMEOUT: int = 15  # in seconds, for explorer, rank and price requests
+HTTP_RETRY_COUNT: int = 5  # retries of rate limited or failed requests
+BACKOFF: tuple[float, float] = (1, 60)  # base and max retry delay, in seconds
+HOST_RATE_LIMITS: dict[str, float] = {  # max requests per second per API host
+    "api.taikoscan.io": 4,
+    "trailblazer.mainnet.taiko.xyz": 10,
+    "api.binance.com": 10,
+}
+DEFAULT_RATE_LIMIT: float = 10  # for hosts not listed above
+RANK_CACHE_TTL: int = 600  # in seconds, how long a wallet's rank is reused
+PRICE_CACHE_TTL: int = 60  # in seconds, how long ETH price is reused
+STALE_CACHE_TTL: int = 3600  # in seconds, expired rank/price shown while refreshing
+
+DAEMON_JOBS: list[tuple[str, str]] = [  # daemon.py, run in order after each UTC reset
+    ("Rubyscore", "all"),  # (Wrap, Rubyscore or Checker; wallets as in selection)
+    ("Checker", "all"),
+]
+DAEMON_START_DELAY: tuple[int, int] = (300, 1800)  # in seconds after the reset
+
+METRICS: bool = True  # print request stats after each run, save data/metrics.prom
+
+CHECK_ON_START: bool = True  # run checker before wallet selection
+CHECKER_ASYNC: bool = True  # use asyncio checker instead of thread pool
+CHECKER_INCREMENTAL: bool = True  # skip explorer for wallets unchanged since last check
+CHECKER_HISTORY: bool = True  # save results to data/history.db for report.py
+CHECKER_JSONL: bool = False  # also save checker rows to data/checker/<date>.jsonl
+CHECKER_PAGE_SIZE: int = 50  # table rows printed at once while checking
+CHECKER_CONCURRENCY: dict[str, int] = {  # max parallel requests per service
+    "explorer": 5,
+    "trailblazer": 20,
+    "rpc": 20,
+}